@@ -0,0 +1,273 @@
+# agent_budget.py
+# Orçamentos de execução para o AgentExecutor: prazo (deadline), tokens e passos (chamadas de ferramentas).
+#
+# Um loop ReAct "confuso" pode chamar o LLM e as ferramentas muitas vezes enquanto o usuário espera.
+# Com run_with_budget(), cada pergunta tem limites; quando algum estoura:
+# - a execução é interrompida na próxima chamada de LLM ou ferramenta (ou imediatamente, no caso do prazo), e
+# - o usuário recebe a melhor resposta possível com o que já foi obtido (a última observação das ferramentas).
+# As métricas (budget_metrics()) mostram com que frequência cada limite é atingido.
+
+import inspect
+import os
+import threading
+import time
+from langchain_core.callbacks import BaseCallbackHandler
+
+_metrics_lock = threading.Lock()
+# 'cancelled' conta as execuções abandonadas no prazo cujo restante foi de fato interrompido (não entra em 'runs').
+_metrics = {"runs": 0, "completed": 0, "deadline": 0, "tokens": 0, "steps": 0, "cancelled": 0}
+
+# Thread em andamento de cada executor: uma nova pergunta não começa enquanto a anterior (abandonada no prazo)
+# ainda estiver rodando no mesmo executor, pois as duas usariam a mesma memória.
+_active_lock = threading.Lock()
+_active_runs = {}
+
+
+class BudgetExceeded(Exception):
+    """Lançada quando a execução passa do prazo, do limite de tokens ou do limite de passos."""
+
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind # "deadline", "tokens", "steps" ou "cancelled"
+
+
+class ExecutionBudget:
+    """
+    Limites de uma execução do agente.
+    Args:
+        deadline_s (float): Tempo máximo, em segundos, para responder.
+        max_tokens (int): Máximo de tokens (prompt + resposta) somando todas as chamadas ao LLM.
+        max_steps (int): Máximo de chamadas de ferramentas.
+    """
+
+    def __init__(self, deadline_s: float = 30.0, max_tokens: int = 8000, max_steps: int = 6):
+        self.deadline_s = deadline_s
+        self.max_tokens = max_tokens
+        self.max_steps = max_steps
+
+    @classmethod
+    def from_env(cls) -> "ExecutionBudget":
+        # Orçamento de cada pergunta: prazo (segundos), tokens somados de todas as chamadas ao LLM e passos (ferramentas).
+        # Configurável pelo .env; ao estourar, o agente para e devolve a melhor resposta que conseguiu até ali.
+        return cls(deadline_s=float(os.getenv("AGENT_DEADLINE_S", "30")),
+                   max_tokens=int(os.getenv("AGENT_MAX_TOKENS", "8000")),
+                   max_steps=int(os.getenv("AGENT_MAX_STEPS", "6")))
+
+
+class BudgetCallbackHandler(BaseCallbackHandler):
+    """
+    Callback que acompanha a execução e interrompe o agente quando um limite é atingido.
+    'raise_error = True' faz o LangChain propagar a exceção, em vez de apenas registrá-la.
+    """
+
+    raise_error = True
+
+    def __init__(self, budget: ExecutionBudget):
+        self.budget = budget
+        self.started_at = time.monotonic()
+        self.tokens_used = 0
+        self.steps = 0
+        self.observations = [] # Saídas das ferramentas, usadas para montar a resposta parcial
+        self.exceeded = None   # Tipo do limite atingido (se algum)
+        self._cancelled = False
+
+    def start(self):
+        # O prazo conta a partir do início real da execução (não do momento em que ela foi pedida).
+        self.started_at = time.monotonic()
+
+    def cancel(self):
+        # Pede a interrupção: a próxima chamada de LLM ou ferramenta deste agente não será feita.
+        self._cancelled = True
+
+    def remaining_s(self) -> float:
+        return self.budget.deadline_s - (time.monotonic() - self.started_at)
+
+    def check(self):
+        if self._cancelled:
+            self._fail("cancelled", "Execução cancelada.")
+        if self.remaining_s() <= 0:
+            self._fail("deadline", f"Prazo de {self.budget.deadline_s}s esgotado.")
+        if self.tokens_used >= self.budget.max_tokens:
+            self._fail("tokens", f"Limite de {self.budget.max_tokens} tokens atingido ({self.tokens_used} usados).")
+        if self.steps > self.budget.max_steps:
+            self._fail("steps", f"Limite de {self.budget.max_steps} passos atingido.")
+
+    def _fail(self, kind: str, message: str):
+        self.exceeded = self.exceeded or kind
+        raise BudgetExceeded(kind, message)
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.check()
+
+    def on_llm_end(self, response, **kwargs):
+        # Só contabiliza: a verificação acontece antes da próxima chamada (on_llm_start / on_tool_start).
+        self.tokens_used += _count_tokens(response)
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        self.steps += 1
+        self.check()
+
+    def on_tool_end(self, output, **kwargs):
+        self.observations.append(str(output))
+
+    def on_agent_finish(self, finish, **kwargs):
+        # Execução abandonada que chegou à resposta final: ela não é gravada na memória (a resposta de
+        # melhor esforço já foi devolvida ao usuário) e conta como cancelada.
+        if self._cancelled:
+            self._fail("cancelled", "Execução cancelada.")
+
+
+def _count_tokens(response) -> int:
+    # O ChatOpenAI informa o uso em 'llm_output' (versões antigas) ou em 'usage_metadata' de cada mensagem.
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage.get("total_tokens"):
+        return usage["total_tokens"]
+    total = 0
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            # Sem informação de uso, estimamos pelo tamanho do texto (aprox. 4 caracteres por token).
+            total += metadata["total_tokens"] if metadata else max(1, len(generation.text) // 4)
+    return total
+
+
+def remaining_budget_s(callbacks):
+    """
+    Tempo restante (segundos) do orçamento da execução à qual estes callbacks pertencem, ou None se não houver.
+    As ferramentas recebem os callbacks da execução e usam este valor como timeout das suas próprias chamadas.
+    """
+    handlers = getattr(callbacks, "handlers", callbacks) or []
+    for handler in handlers:
+        if isinstance(handler, BudgetCallbackHandler):
+            return max(0.0, handler.remaining_s())
+    return None
+
+def best_effort_answer(handler: BudgetCallbackHandler) -> str:
+    # Resposta de melhor esforço: sem nova chamada ao LLM (o orçamento já acabou), usa a última observação.
+    if handler.observations:
+        return ("Não consegui concluir a resposta dentro do tempo/orçamento disponível. "
+                f"Informação obtida até agora: {handler.observations[-1]}")
+    return "Não consegui responder dentro do tempo/orçamento disponível. Tente reformular ou simplificar a pergunta."
+
+def _record(kind: str, run: bool = True):
+    with _metrics_lock:
+        _metrics["runs"] += run
+        _metrics[kind] += 1
+
+def _claim_executor(executor, thread, timeout: float):
+    # Espera (até 'timeout' segundos) a execução anterior deste executor terminar e registra a nova.
+    key, waited_until = id(executor), time.monotonic() + timeout
+    while True:
+        with _active_lock:
+            previous = _active_runs.get(key)
+            if previous is None or not previous.is_alive():
+                _active_runs[key] = thread
+                return
+        if time.monotonic() >= waited_until:
+            raise RuntimeError("Erro: a execução anterior deste agente ainda está em andamento. Tente novamente em instantes.")
+        previous.join(timeout=max(0.0, waited_until - time.monotonic()))
+
+def _release_executor(executor):
+    with _active_lock:
+        if _active_runs.get(id(executor)) is threading.current_thread():
+            del _active_runs[id(executor)]
+
+def run_with_budget(executor, inputs: dict, budget: ExecutionBudget = None) -> dict:
+    """
+    Executa o agente respeitando o orçamento.
+    Cada execução roda em uma thread própria, iniciada na hora: não há fila (uma execução nunca espera por outra),
+    e o prazo começa a contar quando o agente de fato começa. A thread própria permite devolver a resposta
+    no prazo mesmo com uma chamada ainda em andamento.
+    Se a execução anterior do mesmo executor ainda estiver terminando, espera por ela até o prazo do orçamento
+    e, depois disso, lança RuntimeError.
+    Returns:
+        dict: A saída do executor ({"output": ...}), acrescida de 'budget_exceeded' (None ou o tipo do limite),
+              'tokens_used', 'steps' e 'elapsed_s'.
+    """
+    budget = budget or ExecutionBudget()
+    handler = BudgetCallbackHandler(budget)
+    started, finished = threading.Event(), threading.Event()
+    outcome = {}
+
+    def work():
+        handler.start()
+        started.set()
+        try:
+            outcome["result"] = executor.invoke(inputs, config={"callbacks": [handler]})
+        except BudgetExceeded as e:
+            outcome["error"] = e
+            if e.kind == "cancelled":
+                _record("cancelled", run=False) # Execução abandonada que parou antes da próxima chamada
+        except Exception as e:
+            outcome["error"] = e
+        finally:
+            _release_executor(executor)
+            finished.set()
+
+    worker = threading.Thread(target=work, name="agent-budget", daemon=True)
+    _claim_executor(executor, worker, budget.deadline_s)
+    worker.start()
+    started.wait()
+    if not finished.wait(timeout=max(0.0, handler.remaining_s())):
+        # Prazo esgotado com uma chamada em andamento: devolvemos a resposta agora e cancelamos o resto.
+        # Nada novo é iniciado; a chamada em curso termina pelo seu timeout (limitado ao prazo restante).
+        handler.cancel()
+        handler.exceeded = handler.exceeded or "deadline"
+        result, kind = {"output": best_effort_answer(handler)}, "deadline"
+    elif isinstance(outcome.get("error"), BudgetExceeded):
+        result, kind = {"output": best_effort_answer(handler)}, outcome["error"].kind
+    elif "error" in outcome:
+        raise outcome["error"]
+    else:
+        result, kind = dict(outcome["result"]), "completed"
+    _record(kind)
+    result.update(budget_exceeded=None if kind == "completed" else kind, tokens_used=handler.tokens_used,
+                  steps=handler.steps, elapsed_s=round(time.monotonic() - handler.started_at, 3))
+    return result
+
+def run_tool_with_budget(func, tool_input: str, budget: ExecutionBudget = None) -> dict:
+    """
+    Executa uma única ferramenta (sem o loop ReAct) sob o mesmo orçamento de uma execução do agente.
+    Se a ferramenta aceitar o parâmetro 'callbacks', recebe o callback do orçamento: suas chamadas ao LLM
+    são contabilizadas e limitadas ao prazo restante.
+    Returns:
+        dict: {"output": ...} com 'budget_exceeded', 'tokens_used', 'steps' e 'elapsed_s', como em run_with_budget().
+    """
+    handler = BudgetCallbackHandler(budget or ExecutionBudget.from_env())
+    handler.start()
+    try:
+        handler.on_tool_start(None, tool_input)
+        if "callbacks" in inspect.signature(func).parameters:
+            output = func(tool_input, callbacks=[handler])
+        else:
+            output = func(tool_input)
+        handler.on_tool_end(output)
+        kind = "completed"
+    except BudgetExceeded as e:
+        output, kind = best_effort_answer(handler), e.kind
+    _record(kind)
+    return {"output": output, "budget_exceeded": None if kind == "completed" else kind,
+            "tokens_used": handler.tokens_used, "steps": handler.steps,
+            "elapsed_s": round(time.monotonic() - handler.started_at, 3)}
+
+def ask_with_budget(executor, question: str, budget: ExecutionBudget = None) -> dict:
+    """
+    Envia uma pergunta ao agente respeitando o orçamento (por padrão, o configurado no .env) e avisa se ele estourou.
+    Quando o orçamento estoura, o executor não grava a troca na memória; ela é gravada aqui, com a resposta de
+    melhor esforço, para que as próximas perguntas tenham o contexto.
+    """
+    result = run_with_budget(executor, {"input": question}, budget or ExecutionBudget.from_env())
+    if result["budget_exceeded"]:
+        memory = getattr(executor, "memory", None)
+        if memory is not None:
+            memory.save_context({"input": question}, {"output": result["output"]})
+        print(f"[Orçamento atingido: {result['budget_exceeded']}] {result['output']}")
+    return result
+
+def budget_metrics() -> dict:
+    """Contagem de execuções por resultado e a taxa de estouro de orçamento (para acompanhar o SLA de latência)."""
+    with _metrics_lock:
+        metrics = dict(_metrics)
+    exceeded = metrics["runs"] - metrics["completed"]
+    metrics["exceeded_rate"] = exceeded / metrics["runs"] if metrics["runs"] else 0.0
+    return metrics
@@ -2,9 +2,11 @@
 
 from dotenv import load_dotenv
 import os
+import re
 from crewai import Agent, Task, Crew, Process
-from langchain_openai import ChatOpenAI
+from provider_gateway import get_chat_model
 from langchain_community.tools import SerpAPIWrapper # Para a ferramenta de busca
+from crew_checkpoint import run_crew_with_checkpoints, print_run_report # Execução com checkpoint por tarefa
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -20,9 +22,12 @@ if not SERPAPI_API_KEY:
     print("Erro: A chave SERPAPI_API_KEY não está configurada no arquivo .env. A ferramenta de busca não funcionará.")
     exit()
 
-# Inicializa o LLM para todos os agentes (pode ser configurado individualmente)
+# Inicializa os LLMs dos agentes (configurados individualmente)
 # Usando gpt-4 para melhor desempenho no raciocínio complexo de multiagentes.
-llm = ChatOpenAI(model="gpt-4-turbo-preview", temperature=0.7, openai_api_key=OPENAI_API_KEY)
+llm = get_chat_model("gpt-4-turbo-preview", temperature=0.7)
+# Modelo mais rápido e barato para trabalhos mais simples, como resumir resultados de busca.
+# Se o resultado não atender ao expected_output da tarefa, ela é refeita com o gpt-4 (veja task_model_tiers).
+fast_llm = get_chat_model(os.getenv("CREW_FAST_MODEL", "gpt-3.5-turbo"), temperature=0.7)
 
 # --- Ferramentas Compartilhadas (ou específicas, se preferir) ---
 # Nossa ferramenta de busca será usada por vários agentes.
@@ -35,7 +40,7 @@ researcher = Agent(
     backstory='Você é um analista de mercado experiente, especializado em encontrar dados, fatos e tendências online de forma eficiente e precisa.',
     verbose=True, # Para ver o raciocínio detalhado deste agente
     allow_delegation=False, # Este agente não delega, ele executa a pesquisa
-    llm=llm,
+    llm=fast_llm, # Resumir resultados de busca não exige o maior modelo
     tools=[search_tool] # Este agente usa a ferramenta de busca
 )
 
@@ -118,6 +123,33 @@ write_task = Task(
     agent=creative_writer # Esta tarefa será atribuída ao 'creative_writer'
 )
 
+# --- Modelos por Tarefa e Validação do expected_output ---
+# Para cada tarefa, os modelos a tentar, do mais rápido ao mais forte (mesma ordem de 'tasks' na Crew).
+task_model_tiers = [
+    [fast_llm, llm], # research_task: tenta o modelo rápido; se a validação falhar, usa o gpt-4
+    [fast_llm, llm], # content_task: idem
+    [llm],           # write_task: o texto final sempre com o gpt-4
+]
+
+def validate_research(output: str) -> bool:
+    # A SerpAPIWrapper devolve apenas os trechos (snippets) dos resultados, em geral sem os links: em vez de
+    # contar links, o relatório deve ter conteúdo substancial e cobrir os casos de uso e os benefícios pedidos.
+    text = output.lower()
+    return len(output) >= 300 and "uso" in text and "benef" in text
+
+def validate_content_ideas(output: str) -> bool:
+    # Devem ser 3 ideias, cada uma com seu call-to-action.
+    text = output.lower()
+    return all(f"ideia {i}" in text for i in (1, 2, 3)) and text.count("cta") >= 3
+
+POST_MAX_CHARS = 280 # Limite do X (Twitter), pedido na descrição da write_task
+
+def validate_post(output: str) -> bool:
+    # O post final precisa ter hashtags de verdade (#palavra) e caber no limite de caracteres do X.
+    return re.search(r"#\w+", output) is not None and len(output.strip()) <= POST_MAX_CHARS
+
+task_validators = [validate_research, validate_content_ideas, validate_post]
+
 # Monta a equipe (Crew)
 social_media_crew = Crew(
     agents=[researcher, content_creator, creative_writer], # Todos os agentes da equipe
@@ -129,6 +161,17 @@ social_media_crew = Crew(
 # Inicia o processo da equipe
 if __name__ == "__main__":
     print("Iniciando a equipe de criação de conteúdo para redes sociais...")
-    result = social_media_crew.kickoff() # 'kickoff()' inicia o processo!
+    # Por padrão, cada tarefa é executada com checkpoint em ./crew_checkpoints: se algo falhar,
+    # a próxima execução reaproveita as tarefas já concluídas (ex: a pesquisa) e refaz só o resto.
+    # Use CREW_CHECKPOINTS=0 para executar tudo de uma vez com o kickoff() tradicional
+    # e CREW_RETRY_INVALID=1 para refazer as tarefas gravadas sem passar na validação.
+    if os.getenv("CREW_CHECKPOINTS", "1") == "1":
+        result, run_report = run_crew_with_checkpoints(social_media_crew.tasks, tiers=task_model_tiers,
+                                                       validators=task_validators,
+                                                       retry_invalid=os.getenv("CREW_RETRY_INVALID", "0") == "1")
+        print("\n--- Latência, Tokens e Custo por Agente ---")
+        print_run_report(run_report)
+    else:
+        result = social_media_crew.kickoff() # 'kickoff()' inicia o processo!
     print("\n--- Resultado Final da Equipe ---")
     print(result)
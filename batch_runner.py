@@ -0,0 +1,201 @@
+# batch_runner.py
+# Executa um conjunto grande de perguntas no agente (meu_primeiro_agente_3.py), em paralelo.
+# Útil para testes de regressão noturnos e para gerar respostas em massa.
+#
+# Entrada: arquivo JSONL, uma pergunta por linha. Ex:
+#   {"id": "ferias-1", "question": "Qual a política de férias da empresa?", "tenant": "default"}
+# ('id' e 'tenant' são opcionais: sem 'id', usa o número da linha; sem 'tenant', usa o TENANT_ID da sessão.)
+#
+# Saída: arquivo JSONL gravado à medida que as respostas chegam. Se o processo cair, rode o mesmo comando de novo:
+# as perguntas já respondidas com sucesso são puladas (retomada). Respostas parciais (orçamento estourado,
+# status "partial") e erros são executados de novo, e o novo registro é acrescentado ao arquivo.
+# Vale sempre o ÚLTIMO registro de cada id; ao final de run_batch() o arquivo é compactado (um registro por id).
+#
+# Uso: python batch_runner.py perguntas.jsonl respostas.jsonl --concurrency 8
+
+import argparse
+import json
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from meu_primeiro_agente_3 import build_agent_executor, ask, TENANT_ID
+from agent_budget import budget_metrics
+from provider_gateway import gateway_stats
+from tools_module import prefetch_stats
+
+
+def load_questions(path: str) -> list:
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            questions.append({
+                "id": str(item.get("id", line_number)),
+                "question": item.get("question") or item["input"],
+                "tenant": item.get("tenant", TENANT_ID),
+            })
+    return questions
+
+def load_results(path: str) -> dict:
+    """
+    Lê o arquivo de saída: id -> último registro daquele id (o último vale, os anteriores foram refeitos).
+    Linhas incompletas (processo caiu no meio da escrita) são ignoradas.
+    """
+    results = {}
+    if not os.path.exists(path):
+        return results
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            results[record["id"]] = record
+    return results
+
+def load_completed_ids(path: str) -> set:
+    # Perguntas cujo último registro foi respondido com sucesso (as parciais e com erro são refeitas).
+    return {record_id for record_id, record in load_results(path).items() if record.get("status") == "ok"}
+
+def compact_results(path: str):
+    """Regrava o arquivo de saída com um único registro (o último) por id, de forma atômica."""
+    results = load_results(path)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        for record in results.values():
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+
+def percentile(values: list, p: float) -> float:
+    # Percentil pelo método "nearest-rank".
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def run_question(item: dict) -> dict:
+    """
+    Executa uma pergunta em um executor novo (memória e ferramentas próprias),
+    para que uma pergunta não contamine o histórico de outra.
+    """
+    executor = build_agent_executor(item["tenant"], verbose=False)
+    start = time.perf_counter()
+    try:
+        # O orçamento (prazo, tokens, passos) é o mesmo do agente interativo; respostas parciais são marcadas
+        # com status "partial", para serem refeitas na próxima execução.
+        result = ask(item["question"], executor, tenant=item["tenant"])
+        status = "partial" if result["budget_exceeded"] else "ok"
+        return dict(item, status=status, answer=result["output"], fast_path=result["fast_path"],
+                    budget_exceeded=result["budget_exceeded"],
+                    tokens_used=result["tokens_used"], latency_s=round(time.perf_counter() - start, 3))
+    except Exception as e:
+        return dict(item, status="error", error=str(e), latency_s=round(time.perf_counter() - start, 3))
+
+
+class ResultWriter:
+    """Grava cada resultado assim que fica pronto (append + fsync), de forma segura entre threads."""
+
+    def __init__(self, path: str):
+        self.file = open(path, "a", encoding="utf-8")
+        self.lock = threading.Lock()
+        # Se a execução anterior caiu no meio de uma linha, começa em uma linha nova para não corromper o próximo registro.
+        if self.file.tell() > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self.file.write("\n")
+
+    def write(self, record: dict):
+        with self.lock:
+            self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+def run_batch(input_path: str, output_path: str, concurrency: int = 4) -> dict:
+    """
+    Executa todas as perguntas ainda não respondidas, com no máximo 'concurrency' perguntas em andamento.
+    Retorna um resumo com vazão (perguntas/s) e latências p50/p95/p99.
+    """
+    if concurrency < 1:
+        raise ValueError(f"A concorrência deve ser pelo menos 1 (recebido: {concurrency}).")
+    questions = load_questions(input_path)
+    completed = load_completed_ids(output_path)
+    pending = [item for item in questions if item["id"] not in completed]
+    print(f"{len(questions)} perguntas no arquivo, {len(completed)} já respondidas, {len(pending)} a executar.")
+
+    writer = ResultWriter(output_path)
+    latencies, errors, partial = [], 0, 0
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            # Mantém no máximo 'concurrency' tarefas submetidas: a fila não cresce com o tamanho do arquivo.
+            queue = iter(pending)
+            in_flight = set()
+            for item in queue:
+                in_flight.add(pool.submit(run_question, item))
+                if len(in_flight) >= concurrency:
+                    break
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record = future.result()
+                    writer.write(record)
+                    latencies.append(record["latency_s"])
+                    errors += record["status"] == "error"
+                    partial += record["status"] == "partial"
+                    if len(latencies) % 50 == 0:
+                        print(f"{len(latencies)}/{len(pending)} perguntas processadas...")
+                    next_item = next(queue, None)
+                    if next_item is not None:
+                        in_flight.add(pool.submit(run_question, next_item))
+    finally:
+        writer.close()
+    compact_results(output_path)
+
+    elapsed = time.perf_counter() - start
+    return {
+        "processed": len(latencies),
+        "errors": errors,
+        "partial": partial,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_qps": round(len(latencies) / elapsed, 3) if elapsed > 0 else 0.0,
+        "p50_s": percentile(latencies, 50),
+        "p95_s": percentile(latencies, 95),
+        "p99_s": percentile(latencies, 99),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Executa perguntas de um arquivo JSONL no agente, em paralelo.")
+    parser.add_argument("input", help="Arquivo JSONL com as perguntas.")
+    parser.add_argument("output", help="Arquivo JSONL de respostas (também usado para retomar uma execução).")
+    parser.add_argument("--concurrency", type=int, default=4, help="Máximo de perguntas em andamento ao mesmo tempo.")
+    args = parser.parse_args()
+    if args.concurrency < 1:
+        parser.error("--concurrency deve ser pelo menos 1.")
+
+    summary = run_batch(args.input, args.output, concurrency=args.concurrency)
+    print("\n--- Resumo da Execução em Lote ---")
+    print(f"Perguntas processadas: {summary['processed']} (erros: {summary['errors']}, parciais: {summary['partial']})")
+    print(f"Tempo total: {summary['elapsed_s']}s | Vazão: {summary['throughput_qps']} perguntas/s")
+    print(f"Latência p50: {summary['p50_s']}s | p95: {summary['p95_s']}s | p99: {summary['p99_s']}s")
+    metrics = budget_metrics()
+    print(f"Orçamento estourado: {metrics['runs'] - metrics['completed']} de {metrics['runs']} "
+          f"(prazo: {metrics['deadline']}, tokens: {metrics['tokens']}, passos: {metrics['steps']})")
+    stats = gateway_stats()
+    print(f"Requisições à OpenAI: {stats['requests']} | 429: {stats['rate_limited_429']} | "
+          f"Espera no limitador: {stats['throttle_wait_s']:.1f}s")
+    kb_prefetch = prefetch_stats()
+    print(f"Buscas antecipadas: {kb_prefetch['started']} | Aproveitadas: {kb_prefetch['hits']} | "
+          f"Descartadas: {kb_prefetch['wasted']} (taxa de aproveitamento: {kb_prefetch['hit_rate']:.0%})")
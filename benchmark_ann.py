@@ -0,0 +1,60 @@
+# benchmark_ann.py
+# Compara o índice local aproximado (IVF + int8, local_vector_store.py) com a busca exata em float32.
+# Usa vetores sintéticos agrupados (parecidos com embeddings reais), então não precisa de chave de API.
+#
+# Uso: python benchmark_ann.py --n 100000 --dim 1536 --nprobe 1 4 8 16 32
+
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from local_vector_store import IVFIndex, _normalize
+
+parser = argparse.ArgumentParser(description="Benchmark: busca aproximada (IVF int8) x busca exata (float32).")
+parser.add_argument("--n", type=int, default=50000, help="Quantidade de vetores na base.")
+parser.add_argument("--dim", type=int, default=1536, help="Dimensão dos vetores (1536 = OpenAIEmbeddings).")
+parser.add_argument("--queries", type=int, default=200, help="Quantidade de perguntas.")
+parser.add_argument("--k", type=int, default=10, help="Resultados por pergunta (recall@k).")
+parser.add_argument("--nlist", type=int, default=None, help="Clusters do IVF (padrão: raiz de n).")
+parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32], help="Valores de nprobe a testar.")
+args = parser.parse_args()
+
+# 1. Gera dados sintéticos: pontos ao redor de "tópicos", como documentos sobre assuntos parecidos.
+rng = np.random.default_rng(42)
+topics = rng.normal(size=(max(10, args.n // 500), args.dim)).astype(np.float32)
+vectors = _normalize(topics[rng.integers(len(topics), size=args.n)] + 0.6 * rng.normal(size=(args.n, args.dim)).astype(np.float32))
+queries = _normalize(topics[rng.integers(len(topics), size=args.queries)] + 0.6 * rng.normal(size=(args.queries, args.dim)).astype(np.float32))
+
+def percentile_ms(samples, p):
+    return np.percentile(np.array(samples) * 1000, p)
+
+with tempfile.TemporaryDirectory() as directory:
+    # 2. Constrói o índice aproximado
+    start = time.perf_counter()
+    index = IVFIndex.build(vectors, directory, nlist=args.nlist)
+    print(f"Índice IVF construído em {time.perf_counter() - start:.1f}s (n={args.n}, dim={args.dim}, nlist={index.nlist})")
+    index_bytes = sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+    print(f"Tamanho em disco: {index_bytes / 1e6:.1f} MB (float32 completo: {vectors.nbytes / 1e6:.1f} MB)\n")
+
+    # 3. Busca exata (referência): produto interno com todos os vetores em float32.
+    exact_ids, exact_times = [], []
+    for query in queries:
+        start = time.perf_counter()
+        scores = vectors @ query
+        top = np.argpartition(-scores, args.k)[:args.k]
+        exact_ids.append(set(top[np.argsort(-scores[top])].tolist()))
+        exact_times.append(time.perf_counter() - start)
+    print(f"{'método':<16}{'recall@' + str(args.k):>10}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+    print(f"{'exata float32':<16}{1.0:>10.3f}{percentile_ms(exact_times, 50):>10.2f}{percentile_ms(exact_times, 95):>10.2f}")
+
+    # 4. Busca aproximada para cada nprobe: recall em relação à busca exata e latência.
+    for nprobe in args.nprobe:
+        hits, times = 0, []
+        for query, expected in zip(queries, exact_ids):
+            start = time.perf_counter()
+            ids, _ = index.search(query, k=args.k, nprobe=nprobe)
+            times.append(time.perf_counter() - start)
+            hits += len(expected & set(ids.tolist()))
+        recall = hits / (args.k * len(queries))
+        print(f"{'ivf nprobe=' + str(nprobe):<16}{recall:>10.3f}{percentile_ms(times, 50):>10.2f}{percentile_ms(times, 95):>10.2f}")
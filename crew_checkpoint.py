@@ -0,0 +1,183 @@
+# crew_checkpoint.py
+# Execução da Crew tarefa por tarefa, com checkpoint (cache em disco) do resultado de cada tarefa.
+#
+# Com social_media_crew.kickoff(), uma falha na última tarefa obriga a refazer tudo, inclusive a pesquisa
+# (a etapa mais cara: gpt-4 + várias buscas na SerpAPI). Aqui, cada tarefa tem seu resultado gravado em
+# ./crew_checkpoints, sob uma chave calculada a partir de:
+#   - a descrição e o expected_output da tarefa,
+#   - a configuração do agente (role, goal, backstory, modelo, temperatura, ferramentas) e
+#   - os resultados das tarefas anteriores.
+# Assim, ao rodar de novo (ou ao ajustar só o prompt da última tarefa), as tarefas anteriores são
+# reaproveitadas e apenas o que mudou é recalculado.
+#
+# Cada tarefa também pode ter uma lista de modelos ("tiers"), do mais rápido ao mais forte, e um validador
+# do expected_output: se o resultado do modelo rápido não passar na validação, a tarefa é refeita com o próximo.
+# Se nem o último modelo passar, o resultado é gravado marcado como inválido ("valid": false) e reaproveitado
+# nas próximas execuções (com um aviso), em vez de pagar de novo todos os modelos; use retry_invalid=True para refazer.
+# Ao final, o relatório da execução mostra latência e tokens por tarefa/agente/modelo.
+
+import datetime
+import hashlib
+import json
+import os
+import time
+from crewai import Agent, Crew, Task, Process
+from langchain_community.callbacks import get_openai_callback # Contagem de tokens e custo das chamadas à OpenAI
+
+CHECKPOINT_DIR = "./crew_checkpoints"
+
+
+def model_name(llm) -> str:
+    return str(getattr(llm, "model_name", None) or getattr(llm, "model", None) or llm)
+
+def describe_agent(agent) -> dict:
+    """Configuração do agente que influencia o resultado da tarefa (entra na chave do checkpoint)."""
+    llm = agent.llm
+    return {
+        "role": agent.role,
+        "goal": agent.goal,
+        "backstory": agent.backstory,
+        "model": model_name(llm),
+        "temperature": getattr(llm, "temperature", None),
+        "tools": sorted(type(tool).__name__ for tool in (agent.tools or [])),
+    }
+
+def task_cache_key(task, upstream_outputs: list, tiers: list = None) -> str:
+    payload = {
+        "description": task.description,
+        "expected_output": task.expected_output,
+        "agent": describe_agent(task.agent),
+        "tiers": [[model_name(llm), getattr(llm, "temperature", None)] for llm in (tiers or [])],
+        "upstream": upstream_outputs,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def load_checkpoint(key: str, checkpoint_dir: str = CHECKPOINT_DIR):
+    path = os.path.join(checkpoint_dir, f"{key}.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def save_checkpoint(key: str, record: dict, checkpoint_dir: str = CHECKPOINT_DIR):
+    # Grava em um arquivo temporário e renomeia: um checkpoint nunca fica pela metade se o processo cair.
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    path = os.path.join(checkpoint_dir, f"{key}.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+def with_upstream_context(task, upstream_outputs: list, agent=None):
+    """
+    Cria uma cópia da tarefa com os resultados das tarefas anteriores no enunciado,
+    fazendo o papel da passagem de contexto que o Process.sequential faz dentro do kickoff().
+    """
+    if not upstream_outputs:
+        return Task(description=task.description, expected_output=task.expected_output, agent=agent or task.agent)
+    context = "\n\n".join(f"--- Resultado da tarefa anterior {i} ---\n{output}" for i, output in enumerate(upstream_outputs, start=1))
+    return Task(
+        description=f"{task.description}\n\nContexto das tarefas anteriores:\n{context}",
+        expected_output=task.expected_output,
+        agent=agent or task.agent,
+    )
+
+def agent_with_llm(agent, llm):
+    """Cópia do agente usando outro modelo (o executor do CrewAI é montado na criação do agente)."""
+    if llm is None or llm is agent.llm:
+        return agent
+    return Agent(role=agent.role, goal=agent.goal, backstory=agent.backstory, verbose=agent.verbose,
+                 allow_delegation=agent.allow_delegation, tools=agent.tools, llm=llm)
+
+def run_task(task, upstream_outputs: list, verbose: bool = True, llm=None) -> dict:
+    """
+    Executa apenas esta tarefa (em uma Crew de uma tarefa só), medindo latência e tokens.
+    Args:
+        llm: Modelo a usar nesta tentativa (padrão: o modelo do próprio agente).
+    """
+    agent = agent_with_llm(task.agent, llm)
+    single_task = with_upstream_context(task, upstream_outputs, agent)
+    crew = Crew(agents=[agent], tasks=[single_task], process=Process.sequential, verbose=verbose)
+    start = time.perf_counter()
+    with get_openai_callback() as usage:
+        output = str(crew.kickoff())
+    return {
+        "output": output,
+        "model": model_name(agent.llm),
+        "latency_s": round(time.perf_counter() - start, 2),
+        "prompt_tokens": usage.prompt_tokens,
+        "completion_tokens": usage.completion_tokens,
+        "total_tokens": usage.total_tokens,
+        "cost_usd": round(usage.total_cost, 4),
+    }
+
+def run_crew_with_checkpoints(tasks: list, checkpoint_dir: str = CHECKPOINT_DIR, verbose: bool = True,
+                              tiers: list = None, validators: list = None, retry_invalid: bool = False):
+    """
+    Executa as tarefas em sequência, reaproveitando os resultados já gravados em 'checkpoint_dir'.
+    Args:
+        tasks (list): As tarefas da Crew, na ordem de execução.
+        tiers (list): Opcional, alinhada com 'tasks': para cada tarefa, a lista de modelos a tentar,
+                      do mais rápido ao mais forte (None = usar o modelo do agente).
+        validators (list): Opcional, alinhada com 'tasks': funções que recebem o resultado e retornam
+                           True se ele atende ao expected_output (None = aceitar sempre).
+        retry_invalid (bool): Refaz as tarefas cujo checkpoint não passou na validação (padrão: reaproveitá-lo).
+    Returns:
+        (str, list): O resultado da última tarefa (equivalente ao do kickoff()) e o relatório da
+                     execução, com uma linha por tentativa (tarefa, agente, modelo, latência, tokens...).
+    """
+    tiers = tiers or [None] * len(tasks)
+    validators = validators or [None] * len(tasks)
+    outputs, report = [], []
+    for task, task_tiers, validator in zip(tasks, tiers, validators):
+        key = task_cache_key(task, outputs, task_tiers)
+        checkpoint = load_checkpoint(key, checkpoint_dir)
+        valid = checkpoint.get("valid", True) if checkpoint else False
+        if checkpoint and (valid or not retry_invalid):
+            print(f"[Checkpoint] Reaproveitando o resultado de '{task.agent.role}' ({key[:12]}).")
+            if not valid:
+                print("[Validação] Este resultado não atendeu ao expected_output; use retry_invalid=True para refazê-lo.")
+            outputs.append(checkpoint["output"])
+            report.append({"agent": task.agent.role, "model": checkpoint.get("model", "-"), "cached": True,
+                           "valid": valid, "latency_s": 0.0, "total_tokens": 0, "cost_usd": 0.0})
+            continue
+
+        # Tenta os modelos em ordem; se a validação falhar, sobe para o próximo (mais forte).
+        for attempt, llm in enumerate(task_tiers or [None], start=1):
+            print(f"[Checkpoint] Executando a tarefa de '{task.agent.role}' ({key[:12]}), tentativa {attempt}...")
+            run = run_task(task, outputs, verbose=verbose, llm=llm)
+            run.update(agent=task.agent.role, cached=False, valid=validator is None or bool(validator(run["output"])))
+            report.append(run)
+            if run["valid"]:
+                break
+            print(f"[Validação] O resultado de '{task.agent.role}' com {run['model']} não atende ao expected_output.")
+
+        # Mesmo sem passar na validação, o resultado do último modelo é gravado (marcado como inválido):
+        # as tarefas seguintes dependem dele, e refazê-lo a cada execução custaria todos os modelos de novo.
+        save_checkpoint(key, {
+            "key": key,
+            "agent": task.agent.role,
+            "model": run["model"],
+            "description": task.description,
+            "output": run["output"],
+            "valid": run["valid"],
+            "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        }, checkpoint_dir)
+        outputs.append(run["output"])
+    return (outputs[-1] if outputs else ""), report
+
+def print_run_report(report: list):
+    """Imprime a latência, os tokens e o custo de cada tentativa, e os totais por agente."""
+    print(f"\n{'Agente':<30}{'Modelo':<22}{'Origem':<10}{'Válido':<8}{'Latência':>10}{'Tokens':>9}{'Custo US$':>11}")
+    for row in report:
+        origin = "cache" if row["cached"] else "execução"
+        print(f"{row['agent']:<30}{row['model']:<22}{origin:<10}{'sim' if row['valid'] else 'não':<8}"
+              f"{row['latency_s']:>9.1f}s{row['total_tokens']:>9}{row['cost_usd']:>11.4f}")
+
+    totals = {}
+    for row in report:
+        agent_totals = totals.setdefault(row["agent"], {"latency_s": 0.0, "total_tokens": 0, "cost_usd": 0.0})
+        for field in agent_totals:
+            agent_totals[field] += row[field]
+    print("\nTotais por agente:")
+    for agent, agent_totals in totals.items():
+        print(f"- {agent}: {agent_totals['latency_s']:.1f}s, {agent_totals['total_tokens']} tokens, US$ {agent_totals['cost_usd']:.4f}")
@@ -0,0 +1,110 @@
+# intent_router.py
+# Roteador de intenções local: encaminha perguntas "óbvias" direto para a ferramenta certa, sem o loop ReAct.
+#
+# No loop ReAct, mesmo uma pergunta simples sobre políticas da empresa custa várias chamadas ao LLM
+# (Thought -> Action -> Observation -> Final Answer). Quando a pergunta claramente pertence a uma única
+# ferramenta, o roteador chama essa ferramenta diretamente e devolve a resposta dela.
+# Perguntas ambíguas continuam indo para o agente completo, assim como qualquer pedido que pareça uma ação
+# (enviar e-mail, agendar reunião, avisar no Slack...), mesmo que também mencione uma política.
+
+import math
+import threading
+from knowledge_base import text_terms
+
+# Palavras-chave extras por ferramenta, além da própria descrição da ferramenta.
+# Só as ferramentas listadas em FAST_PATH_TOOLS podem ser chamadas diretamente; as demais servem
+# apenas como "concorrentes" para detectar perguntas ambíguas.
+# As ferramentas de ação incluem os verbos no imperativo e no infinitivo ("agende", "agendar"), já que as
+# descrições (em português e em inglês técnico) não cobrem o jeito como os pedidos costumam ser escritos.
+TOOL_KEYWORDS = {
+    "Query Internal Knowledge Base": (
+        "política políticas férias reembolso despesas refeições limite subsídio desenvolvimento profissional "
+        "cursos workshops certificações trabalho remoto home office modelo híbrido presencial benefícios RH"
+    ),
+    "Google Search": "quem atual atualmente CEO presidente notícias hoje internet mundo país capital população",
+    "Send Email": "envie enviar mande mandar e-mail email escreva escrever responda responder encaminhe encaminhar",
+    "Create Calendar Event": (
+        "agende agendar marque marcar reunião reuniões evento compromisso convite convide convidar remarque remarcar"
+    ),
+    "Check Calendar Availability": "verifique verificar disponibilidade disponíveis livres agenda horário horários",
+    "Post Slack Message": (
+        "poste postar publique publicar avise avisar notifique notificar comunique comunicar mensagem canal Slack"
+    ),
+}
+
+# Ferramentas que respondem a pergunta por completo e sem efeitos colaterais (podem pular o agente).
+FAST_PATH_TOOLS = ("Query Internal Knowledge Base",)
+
+
+def _cosine(a, b) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class IntentRouter:
+    """
+    Pontua a pergunta contra cada ferramenta e decide se ela pode pular o loop ReAct.
+    Perguntas em que alguma ferramenta com efeitos colaterais (marcada com @side_effecting) tem pontuação
+    maior que zero sempre vão para o agente: o atalho nunca pode "engolir" uma ação pedida pelo usuário.
+    Args:
+        tools (list): As ferramentas do agente (usamos 'name' e 'description').
+        threshold (float): Pontuação mínima (0 a 1) da melhor ferramenta para usar o atalho.
+        margin (float): Diferença mínima entre a melhor e a segunda melhor ferramenta.
+        embeddings: Modelo de embeddings opcional; se informado, a similaridade semântica com a
+                    descrição das ferramentas é combinada com a pontuação por palavras.
+    """
+
+    def __init__(self, tools: list, threshold: float = 0.5, margin: float = 0.3, embeddings=None,
+                 keywords: dict = None, fast_path_tools=FAST_PATH_TOOLS):
+        keywords = TOOL_KEYWORDS if keywords is None else keywords
+        self.threshold = threshold
+        self.margin = margin
+        self.embeddings = embeddings
+        self.fast_path_tools = set(fast_path_tools)
+        self.action_tools = {tool.name for tool in tools if getattr(tool.func, "side_effecting", False)}
+        self.descriptions = {tool.name: tool.description for tool in tools}
+        self.vocabulary = {tool.name: text_terms(f"{tool.description} {keywords.get(tool.name, '')}") for tool in tools}
+        self._description_vectors = None
+        self._lock = threading.Lock()
+        self.stats = {"fast_path": 0, "agent": 0}
+
+    def _embedding_scores(self, question: str) -> dict:
+        if self._description_vectors is None:
+            names = list(self.descriptions)
+            vectors = self.embeddings.embed_documents([self.descriptions[name] for name in names])
+            self._description_vectors = dict(zip(names, vectors))
+        question_vector = self.embeddings.embed_query(question)
+        return {name: _cosine(question_vector, vector) for name, vector in self._description_vectors.items()}
+
+    def scores(self, question: str) -> dict:
+        """Pontuação (0 a 1) de cada ferramenta: fração dos termos da pergunta que ela "cobre"."""
+        question_terms = text_terms(question)
+        if not question_terms:
+            return {name: 0.0 for name in self.vocabulary}
+        scores = {name: len(question_terms & vocab) / len(question_terms) for name, vocab in self.vocabulary.items()}
+        if self.embeddings is not None:
+            semantic = self._embedding_scores(question)
+            scores = {name: (score + max(0.0, semantic[name])) / 2 for name, score in scores.items()}
+        return scores
+
+    def route(self, question: str):
+        """
+        Retorna o nome da ferramenta que deve atender a pergunta diretamente,
+        ou None quando a pergunta deve seguir para o agente completo.
+        """
+        ranked = sorted(self.scores(question).items(), key=lambda item: item[1], reverse=True)
+        best_name, best_score = ranked[0] if ranked else (None, 0.0)
+        second_score = ranked[1][1] if len(ranked) > 1 else 0.0
+        scores = dict(ranked)
+        confident = best_score >= self.threshold and best_score - second_score >= self.margin
+        asks_for_action = any(scores[name] > 0 for name in self.action_tools)
+        chosen = best_name if confident and best_name in self.fast_path_tools and not asks_for_action else None
+        with self._lock:
+            self.stats["fast_path" if chosen else "agent"] += 1
+        return chosen
+
+    def route_stats(self) -> dict:
+        with self._lock:
+            total = self.stats["fast_path"] + self.stats["agent"]
+            return dict(self.stats, fast_path_rate=self.stats["fast_path"] / total if total else 0.0)
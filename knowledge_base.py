@@ -0,0 +1,444 @@
+# knowledge_base.py
+# Funções auxiliares para a etapa de Recuperação (Retrieval) da nossa base de conhecimento.
+# Ficam separadas do tools_module.py para que possam ser reaproveitadas pelo indexador e pelos agentes.
+
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.documents import Document
+
+# --- 1. Normalização de Texto ---
+# Palavras muito comuns em português que não ajudam a decidir se um trecho é relevante.
+STOPWORDS_PT = {
+    "a", "o", "as", "os", "um", "uma", "uns", "umas", "de", "do", "da", "dos", "das",
+    "em", "no", "na", "nos", "nas", "por", "para", "pela", "pelo", "com", "sem", "e",
+    "ou", "que", "qual", "quais", "quanto", "quantos", "como", "onde", "quando", "se",
+    "ao", "aos", "à", "às", "é", "ser", "são", "foi", "tem", "têm", "há", "existe",
+    "algum", "alguma", "sobre", "empresa", "meu", "minha", "seu", "sua",
+}
+
+def _strip_accents(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+_STOPWORDS = {_strip_accents(w) for w in STOPWORDS_PT}
+
+def normalize_tokens(text: str) -> list:
+    """
+    Converte um texto em uma lista de termos normalizados (minúsculos, sem acentos e sem stopwords).
+    Ex: "Qual a Política de Férias?" -> ["politica", "ferias"]
+    """
+    return [t for t in re.findall(r"\w+", _strip_accents(text)) if t not in _STOPWORDS and len(t) > 1]
+
+def _stem(token: str) -> str:
+    # "Stemming" bem simples: corta plurais e sufixos comuns para que
+    # "reembolsos" e "reembolso" (ou "refeições" e "refeição") sejam considerados o mesmo termo.
+    for suffix in ("coes", "cao", "oes", "ais", "es", "s"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[: -len(suffix)]
+    return token
+
+def text_terms(text: str) -> set:
+    """Conjunto de termos normalizados e "stemizados" de um texto, usado nas comparações lexicais."""
+    return {_stem(t) for t in normalize_tokens(text)}
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimativa barata do número de tokens de um texto (aprox. 4 caracteres por token).
+    Evita depender do 'tiktoken' só para controlar o orçamento do prompt.
+    """
+    return max(1, len(text) // 4)
+
+
+# --- 2. Reranking (Reordenação) dos Candidatos ---
+
+def lexical_overlap_score(query: str, text: str) -> float:
+    """
+    Pontua um trecho pela sobreposição de termos com a pergunta (0.0 a 1.0).
+    Funciona como um "cross-scorer" local: olha para a pergunta e o trecho juntos, sem chamar nenhuma API.
+    """
+    query_terms = text_terms(query)
+    if not query_terms:
+        return 0.0
+    return len(query_terms & text_terms(text)) / len(query_terms)
+
+def rerank_documents(query: str, docs: list, top_n: int = 4) -> list:
+    """
+    Reordena os documentos recuperados pela busca vetorial usando a pontuação lexical.
+    Em caso de empate, mantém a ordem original (a da similaridade de embeddings).
+    """
+    scored = [(lexical_overlap_score(query, doc.page_content), -i, doc) for i, doc in enumerate(docs)]
+    scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+    return [doc for _, _, doc in scored[:top_n]]
+
+
+# --- 3. Compressão do Contexto ---
+
+def split_sentences(text: str) -> list:
+    # Considera tanto a pontuação final quanto as quebras de linha (nossos documentos têm uma regra por linha).
+    parts = re.split(r"(?<=[.!?])\s+|\n+", text)
+    return [p.strip() for p in parts if p.strip()]
+
+def compress_context(query: str, docs: list, max_tokens: int = 300, min_score: float = 0.0) -> str:
+    """
+    Extrai apenas as frases relevantes dos documentos, respeitando um orçamento de tokens.
+    Args:
+        query (str): A pergunta do usuário.
+        docs (list): Documentos já reordenados (os mais relevantes primeiro).
+        max_tokens (int): Orçamento aproximado de tokens para o contexto enviado ao LLM.
+        min_score (float): Frases com pontuação menor ou igual a este valor são descartadas.
+    Returns:
+        str: O contexto comprimido, com as frases na ordem em que aparecem nos documentos.
+    """
+    candidates = []
+    for doc_index, doc in enumerate(docs):
+        sentences = split_sentences(doc.page_content)
+        for sent_index, sentence in enumerate(sentences):
+            score = lexical_overlap_score(query, sentence)
+            if score > min_score:
+                candidates.append((score, doc_index, sent_index, sentence))
+
+    # Se nenhuma frase tiver termos em comum, usamos o início do melhor documento como contexto mínimo.
+    if not candidates and docs:
+        sentences = split_sentences(docs[0].page_content)
+        candidates = [(0.0, 0, i, s) for i, s in enumerate(sentences)]
+
+    # Escolhe as melhores frases até esgotar o orçamento...
+    selected = []
+    used_tokens = 0
+    for score, doc_index, sent_index, sentence in sorted(candidates, key=lambda c: (-c[0], c[1], c[2])):
+        cost = estimate_tokens(sentence)
+        if used_tokens + cost > max_tokens:
+            continue
+        selected.append((doc_index, sent_index, sentence))
+        used_tokens += cost
+
+    # ... e devolve na ordem original para manter a leitura natural.
+    selected.sort()
+    return "\n".join(sentence for _, _, sentence in selected)
+
+
+# --- 4. Divisão por Seções (Chunking Estrutural) ---
+
+def is_section_heading(line: str) -> bool:
+    # Nos nossos documentos, um título de seção é uma linha curta terminada em ':' (ex: "Política de Férias:").
+    line = line.strip()
+    return line.endswith(":") and 0 < len(line) <= 80 and "." not in line
+
+def _section_chunks(section: str, lines: list, source: str, chunk_size: int) -> list:
+    heading = f"{section}:\n" if section else ""
+    metadata = {"source": source, "section": section}
+    chunks, current = [], []
+    for line in lines:
+        if current and len(heading) + len("\n".join(current + [line])) > chunk_size:
+            chunks.append(Document(page_content=heading + "\n".join(current), metadata=dict(metadata)))
+            current = []
+        current.append(line)
+    if current:
+        chunks.append(Document(page_content=heading + "\n".join(current), metadata=dict(metadata)))
+    return chunks
+
+def split_by_sections(documents: list, chunk_size: int = 1000) -> list:
+    """
+    Divide os documentos respeitando os títulos de seção, em vez de cortar a cada N caracteres.
+    Cada chunk recebe os metadados 'section' (título sem os ':') e 'source' (arquivo de origem),
+    que podem ser usados depois para filtrar a busca vetorial.
+    Seções maiores que 'chunk_size' são divididas em linhas inteiras, repetindo o título em cada pedaço.
+    """
+    chunks = []
+    for document in documents:
+        source = document.metadata.get("source", "")
+        section, lines = "", []
+        for line in document.page_content.splitlines():
+            if is_section_heading(line):
+                chunks.extend(_section_chunks(section, lines, source, chunk_size))
+                section, lines = line.strip()[:-1].strip(), []
+            elif line.strip():
+                lines.append(line.strip())
+        chunks.extend(_section_chunks(section, lines, source, chunk_size))
+    return chunks
+
+def detect_section(query: str, sections: list):
+    """
+    Escolhe a seção mais provável para a pergunta comparando os termos da pergunta com os títulos.
+    Termos presentes em todos os títulos (ex: "Política") são ignorados, pois não ajudam a distinguir.
+    Retorna o título da seção ou None quando não há uma escolha clara (a busca então usa a coleção inteira).
+    """
+    titles = {title: text_terms(title) for title in sections if title}
+    if len(titles) < 2:
+        return None
+    common = set.intersection(*titles.values())
+    query_terms = text_terms(query)
+    scores = sorted(((len(query_terms & (terms - common)), title) for title, terms in titles.items()), reverse=True)
+    best_score, best_title = scores[0]
+    if best_score == 0 or best_score == scores[1][0]:
+        return None
+    return best_title
+
+
+# --- 5. Bases de Conhecimento por Tenant (Unidade de Negócio) ---
+
+DEFAULT_TENANT = "default"
+
+def tenant_persist_directory(tenant: str, backend: str = "chroma") -> str:
+    """
+    Pasta da base vetorial de um tenant. O tenant padrão continua em ./chroma_db (ou ./ann_index),
+    e os demais ficam em ./tenants/<tenant>/chroma_db (ou ann_index).
+    """
+    if not re.fullmatch(r"[A-Za-z0-9_-]+", tenant or ""):
+        raise ValueError(f"Nome de tenant inválido: {tenant!r}. Use apenas letras, números, '_' e '-'.")
+    folder = "ann_index" if backend == "local_ann" else "chroma_db"
+    if tenant == DEFAULT_TENANT:
+        return f"./{folder}"
+    return os.path.join(".", "tenants", tenant, folder)
+
+def directory_size(path: str) -> int:
+    # Tamanho em disco da base. Para o Chroma, é uma boa estimativa da memória que ela ocupa quando aberta
+    # (o índice HNSW é carregado inteiro na RAM); o índice local (memory-mapped) informa a sua própria estimativa.
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+def index_version(path: str) -> int:
+    """
+    Versão de uma base em disco: a data de modificação mais recente da pasta e dos arquivos no seu primeiro nível.
+    Muda sempre que a base é reindexada (o CURRENT do índice local é trocado; o chroma.sqlite3 é regravado).
+    """
+    try:
+        with os.scandir(path) as entries:
+            return max([os.stat(path).st_mtime_ns] + [entry.stat().st_mtime_ns for entry in entries])
+    except FileNotFoundError:
+        return 0
+
+class TenantStoreCache:
+    """
+    Mantém abertas apenas as bases vetoriais usadas recentemente (LRU - Least Recently Used).
+    Cada base só é aberta na primeira consulta do seu tenant (carregamento preguiçoso), então
+    cadastrar um novo tenant não faz todos os workers carregarem todos os índices.
+    Quando o número de bases abertas ou a memória estimada passa do limite, as menos usadas são fechadas.
+    Se a base de um tenant for reindexada (a versão muda), ela é fechada e reaberta na consulta seguinte.
+    Com use(), os usos em andamento são contados: uma base removida do cache só é fechada quando o último
+    uso termina, então uma consulta nunca perde a base no meio da busca.
+    """
+
+    def __init__(self, opener, max_open: int = 8, max_bytes: int = 512 * 1024 * 1024, size_fn=None, closer=None,
+                 version_fn=None):
+        """
+        Args:
+            opener: Função que recebe o nome do tenant e retorna a base vetorial aberta.
+            max_open (int): Máximo de bases abertas ao mesmo tempo.
+            max_bytes (int): Memória máxima estimada para as bases abertas.
+            size_fn: Função que recebe o tenant e a base aberta e estima a memória que ela ocupa, em bytes.
+            closer: Função que recebe uma base removida do cache e libera seus recursos (arquivos, índices em memória).
+            version_fn: Função que recebe o tenant e retorna a versão atual da sua base em disco (ex: index_version).
+        """
+        self.opener = opener
+        self.max_open = max_open
+        self.max_bytes = max_bytes
+        self.size_fn = size_fn or (lambda tenant, store: 0)
+        self.closer = closer or (lambda store: None)
+        self.version_fn = version_fn or (lambda tenant: None)
+        self._stores = OrderedDict() # tenant -> (store, tamanho estimado, versão)
+        self._lock = threading.Lock()
+        self._opening = {}           # tenant -> Lock, para não abrir a mesma base duas vezes em paralelo
+        self._users = {}             # id(base) -> usos em andamento (use())
+        self._retired = {}           # id(base) -> base removida do cache, esperando os usos terminarem para fechar
+        self.stats = {"hits": 0, "opens": 0, "evictions": 0, "reloads": 0, "deferred_closes": 0}
+
+    def _cached(self, tenant: str, version, track: bool):
+        # Retorna a base aberta se ela ainda está na versão atual (chamar com self._lock).
+        if tenant in self._stores and self._stores[tenant][2] == version:
+            self._stores.move_to_end(tenant)
+            self.stats["hits"] += 1
+            store = self._stores[tenant][0]
+            if track:
+                self._users[id(store)] = self._users.get(id(store), 0) + 1
+            return store
+        return None
+
+    def get(self, tenant: str):
+        """
+        Retorna a base aberta do tenant (abrindo-a, se preciso). A base pode ser fechada a qualquer momento
+        por outra thread; para consultas, prefira use().
+        """
+        return self._get(tenant, track=False)
+
+    @contextmanager
+    def use(self, tenant: str):
+        """Usa a base do tenant dentro de um bloco 'with': ela não é fechada enquanto o bloco não terminar."""
+        store = self._get(tenant, track=True)
+        try:
+            yield store
+        finally:
+            self._release(store)
+
+    def _get(self, tenant: str, track: bool):
+        version = self.version_fn(tenant)
+        with self._lock:
+            store = self._cached(tenant, version, track)
+            if store is not None:
+                return store
+            opening_lock = self._opening.setdefault(tenant, threading.Lock())
+
+        # Abre fora do lock global: abrir uma base pode ser lento e não deve travar os outros tenants.
+        with opening_lock:
+            with self._lock:
+                store = self._cached(tenant, version, track)
+                if store is not None:
+                    return store
+            store = self.opener(tenant)
+            size = self.size_fn(tenant, store)
+            with self._lock:
+                evicted = []
+                if tenant in self._stores:
+                    # Versão antiga (a base foi reindexada): sai do cache e é fechada.
+                    evicted.append(self._stores.pop(tenant)[0])
+                    self.stats["reloads"] += 1
+                self._stores[tenant] = (store, size, version)
+                if track:
+                    self._users[id(store)] = 1
+                self.stats["opens"] += 1
+                evicted += self._evict()
+                self._opening.pop(tenant, None)
+                to_close = self._retire(evicted)
+        # Fecha as bases removidas fora do lock (fechar pode ser lento).
+        for old_store in to_close:
+            self.closer(old_store)
+        return store
+
+    def _retire(self, evicted: list) -> list:
+        # Bases sem uso em andamento podem ser fechadas já; as demais esperam o último _release (chamar com self._lock).
+        to_close = []
+        for store in evicted:
+            if self._users.get(id(store)):
+                self._retired[id(store)] = store
+                self.stats["deferred_closes"] += 1
+            else:
+                to_close.append(store)
+        return to_close
+
+    def _release(self, store):
+        with self._lock:
+            remaining = self._users.get(id(store), 1) - 1
+            if remaining > 0:
+                self._users[id(store)] = remaining
+                return
+            self._users.pop(id(store), None)
+            retired = self._retired.pop(id(store), None)
+        if retired is not None:
+            self.closer(retired)
+
+    def _evict(self) -> list:
+        # Remove as bases menos usadas até respeitar os limites (a recém-aberta nunca é removida).
+        evicted = []
+        while len(self._stores) > 1 and (len(self._stores) > self.max_open or self.memory_bytes() > self.max_bytes):
+            _, (store, _, _) = self._stores.popitem(last=False)
+            evicted.append(store)
+            self.stats["evictions"] += 1
+        return evicted
+
+    def memory_bytes(self) -> int:
+        return sum(size for _, size, _ in self._stores.values())
+
+    def open_tenants(self) -> list:
+        with self._lock:
+            return list(self._stores)
+
+
+# --- 6. Recuperação Especulativa (Prefetch) ---
+
+class SpeculativePrefetcher:
+    """
+    Começa a busca na base (embedding + busca vetorial) assim que a pergunta chega, em paralelo com a
+    primeira chamada ao LLM do agente. Se o agente decidir consultar a base com uma pergunta parecida,
+    o resultado já está pronto (ou a caminho); se não consultar, o resultado é simplesmente descartado.
+    """
+
+    def __init__(self, fetch_fn, max_workers: int = 4, ttl_s: float = 60.0, min_overlap: float = 0.6, max_pending: int = 256):
+        """
+        Args:
+            fetch_fn: Função (pergunta, tenant) -> candidatos recuperados.
+            ttl_s (float): Tempo máximo que um resultado antecipado fica disponível.
+            min_overlap (float): Sobreposição mínima de termos entre a pergunta original e a consulta
+                                 feita pelo agente para que o resultado antecipado seja aproveitado.
+            max_pending (int): Máximo de buscas antecipadas guardadas (as mais antigas são descartadas).
+        """
+        self.fetch_fn = fetch_fn
+        self.ttl_s = ttl_s
+        self.min_overlap = min_overlap
+        self.max_pending = max_pending
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="kb-prefetch")
+        self._pending = OrderedDict() # (tenant, pergunta) -> (momento de criação, future)
+        self._lock = threading.Lock()
+        self.stats = {"started": 0, "hits": 0, "misses": 0, "wasted": 0}
+
+    def start(self, question: str, tenant: str = DEFAULT_TENANT):
+        key = (tenant, question)
+        with self._lock:
+            self._expire()
+            if key in self._pending:
+                return
+            self._pending[key] = (time.monotonic(), self._pool.submit(self.fetch_fn, question, tenant))
+            self.stats["started"] += 1
+            while len(self._pending) > self.max_pending:
+                self._drop(next(iter(self._pending)))
+
+    def take(self, query: str, tenant: str = DEFAULT_TENANT, refine=None):
+        """
+        Retorna os candidatos antecipados para uma consulta parecida (esperando a busca terminar, se preciso),
+        ou None quando não há busca antecipada aproveitável (a consulta deve ser feita normalmente).
+        Args:
+            query (str): A consulta feita pelo agente (pode ser só uma parte da pergunta original).
+            refine: Função opcional que adapta o resultado antecipado à consulta do agente (ex: filtro de
+                    seção) e retorna None quando ele não serve; nesse caso, conta como miss.
+        """
+        with self._lock:
+            self._expire()
+            matches = [(lexical_overlap_score(query, question), (t, question)) for t, question in self._pending if t == tenant]
+            matches = [m for m in matches if m[0] >= self.min_overlap]
+            if not matches:
+                self.stats["misses"] += 1
+                return None
+            _, key = max(matches)
+            _, future = self._pending.pop(key)
+        try:
+            result = future.result()
+        except Exception:
+            # Se a busca antecipada falhou, a consulta normal é feita em seguida.
+            with self._lock:
+                self.stats["misses"] += 1
+            return None
+        if refine is not None:
+            result = refine(result)
+        with self._lock:
+            self.stats["hits" if result is not None else "misses"] += 1
+        return result
+
+    def discard(self, question: str, tenant: str = DEFAULT_TENANT):
+        """Descarta a busca antecipada de uma pergunta que já foi respondida (se não foi usada)."""
+        with self._lock:
+            if (tenant, question) in self._pending:
+                self._drop((tenant, question))
+
+    def _drop(self, key):
+        _, future = self._pending.pop(key)
+        future.cancel() # Se ainda não começou, nem chega a rodar.
+        self.stats["wasted"] += 1
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [k for k, (created, _) in self._pending.items() if now - created > self.ttl_s]:
+            self._drop(key)
+
+    def prefetch_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["hit_rate"] = stats["hits"] / stats["started"] if stats["started"] else 0.0
+        return stats
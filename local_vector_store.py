@@ -0,0 +1,323 @@
+# local_vector_store.py
+# Backend vetorial local, alternativo ao Chroma, para bases de conhecimento grandes.
+#
+# Em vez de manter todos os embeddings em float32 na memória, usamos:
+# - Um índice IVF (Inverted File): os vetores são agrupados em 'nlist' clusters (k-means) e,
+#   na busca, só os 'nprobe' clusters mais próximos da pergunta são examinados (busca aproximada / ANN).
+# - Quantização int8: cada vetor ocupa 1 byte por dimensão (4x menos que float32), com uma escala por vetor.
+# - Arquivos .npy abertos com memory-map: o sistema operacional carrega sob demanda só as páginas usadas,
+#   então abrir o índice é instantâneo (sem cópia) e o uso de RAM (RSS) fica baixo.
+#
+# 'nprobe' controla o equilíbrio entre recall e latência: mais clusters examinados = mais recall, mais tempo.
+#
+# Cada construção do índice é gravada em uma subpasta nova (versão) e só então o arquivo CURRENT passa a
+# apontar para ela. Processos que já têm a versão anterior aberta (memory-mapped) continuam lendo arquivos
+# intactos: sobrescrever um .npy mapeado em memória o trunca e derruba o processo (Bus error).
+
+import json
+import os
+import shutil
+import time
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.vectorstores import VectorStore
+
+DEFAULT_NPROBE = 8
+CURRENT_FILE = "CURRENT"   # Arquivo com o nome da versão ativa do índice
+KEEP_VERSIONS = 2          # Versões mantidas em disco (a anterior ainda pode estar aberta por outros processos)
+INDEXED_METADATA = ("section",) # Metadados com máscaras pré-calculadas para os filtros da busca
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    # Com vetores normalizados, o produto interno é a similaridade de cosseno.
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def quantize_int8(vectors: np.ndarray):
+    """
+    Quantiza vetores float32 para int8 com uma escala por vetor (quantização simétrica).
+    Retorna (codes, scales), onde vetor ≈ codes * scale.
+    """
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales = np.maximum(scales, 1e-12).astype(np.float32)
+    codes = np.round(vectors / scales[:, None]).clip(-127, 127).astype(np.int8)
+    return codes, scales
+
+def _kmeans(vectors: np.ndarray, nlist: int, n_iter: int = 10, seed: int = 0) -> np.ndarray:
+    # K-means esférico simples (vetores e centróides normalizados).
+    rng = np.random.default_rng(seed)
+    centroids = vectors[rng.choice(len(vectors), size=nlist, replace=False)].copy()
+    for _ in range(n_iter):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = vectors[assignments == c]
+            # Clusters vazios recebem um ponto aleatório para não "morrerem".
+            centroids[c] = members.mean(axis=0) if len(members) else vectors[rng.integers(len(vectors))]
+        centroids = _normalize(centroids)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """
+    Índice IVF com vetores quantizados em int8, persistido em arquivos .npy abertos com memory-map.
+    Os vetores de um mesmo cluster ficam contíguos no arquivo, então cada cluster examinado é uma leitura sequencial.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "ivf_meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        self.dim = meta["dim"]
+        self.nlist = meta["nlist"]
+        # Os centróides e offsets são pequenos e ficam na memória; o resto é memory-mapped (zero-copy).
+        self.centroids = np.load(os.path.join(directory, "centroids.npy"))
+        self.offsets = np.load(os.path.join(directory, "offsets.npy"))
+        self.codes = np.load(os.path.join(directory, "codes.npy"), mmap_mode="r")
+        self.scales = np.load(os.path.join(directory, "scales.npy"), mmap_mode="r")
+        self.ids = np.load(os.path.join(directory, "ids.npy"), mmap_mode="r")
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, vectors, directory: str, nlist: int = None, train_size: int = 20000, seed: int = 0):
+        """
+        Treina o k-means, quantiza os vetores e grava o índice em 'directory'.
+        Args:
+            vectors: Matriz (n, dim) com os embeddings, na ordem dos ids 0..n-1.
+            directory (str): Pasta onde o índice será gravado.
+            nlist (int): Número de clusters. Padrão: raiz quadrada de n.
+            train_size (int): Máximo de vetores usados para treinar o k-means (amostra).
+        """
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+        n, dim = vectors.shape
+        nlist = max(1, min(nlist or int(np.sqrt(n)), n))
+
+        rng = np.random.default_rng(seed)
+        sample = vectors if n <= train_size else vectors[rng.choice(n, size=train_size, replace=False)]
+        centroids = _kmeans(sample, nlist, seed=seed)
+
+        # Atribui cada vetor ao seu cluster em lotes, para não criar uma matriz n x nlist gigante.
+        assignments = np.empty(n, dtype=np.int64)
+        for start in range(0, n, 10000):
+            assignments[start:start + 10000] = np.argmax(vectors[start:start + 10000] @ centroids.T, axis=1)
+
+        # Ordena por cluster: cada lista invertida vira um intervalo contíguo [offsets[c], offsets[c+1]).
+        order = np.argsort(assignments, kind="stable")
+        offsets = np.zeros(nlist + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assignments, minlength=nlist))
+        codes, scales = quantize_int8(vectors[order])
+
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "centroids.npy"), centroids)
+        np.save(os.path.join(directory, "offsets.npy"), offsets)
+        np.save(os.path.join(directory, "codes.npy"), codes)
+        np.save(os.path.join(directory, "scales.npy"), scales)
+        np.save(os.path.join(directory, "ids.npy"), order.astype(np.int64))
+        with open(os.path.join(directory, "ivf_meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"dim": dim, "nlist": nlist, "count": n}, f)
+        return cls(directory)
+
+    def search(self, query, k: int = 4, nprobe: int = DEFAULT_NPROBE, allowed=None):
+        """
+        Busca aproximada dos k vetores mais similares à pergunta.
+        Args:
+            query: Embedding da pergunta (dim,).
+            k (int): Quantidade de resultados.
+            nprobe (int): Quantos clusters examinar (maior = mais recall, mais latência).
+            allowed: Máscara booleana opcional por id (usada para filtros de metadados).
+        Returns:
+            (ids, scores): Arrays com os ids originais e as similaridades de cosseno aproximadas.
+        """
+        query = _normalize(np.asarray(query, dtype=np.float32))
+        nprobe = max(1, min(nprobe, self.nlist))
+        probe = np.argsort(-(self.centroids @ query))[:nprobe]
+
+        all_ids, all_scores = [], []
+        for c in probe:
+            start, end = self.offsets[c], self.offsets[c + 1]
+            if start == end:
+                continue
+            ids = np.asarray(self.ids[start:end])
+            scores = (self.codes[start:end].astype(np.float32) @ query) * self.scales[start:end]
+            if allowed is not None:
+                keep = allowed[ids]
+                ids, scores = ids[keep], scores[keep]
+            all_ids.append(ids)
+            all_scores.append(scores)
+
+        if not all_ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        ids, scores = np.concatenate(all_ids), np.concatenate(all_scores)
+        top = np.argsort(-scores)[:k]
+        return ids[top], scores[top]
+
+
+def current_version_directory(persist_directory: str) -> str:
+    """
+    Pasta da versão ativa do índice, indicada pelo arquivo CURRENT.
+    Índices gravados antes do versionamento (sem CURRENT) usam a própria 'persist_directory'.
+    """
+    pointer = os.path.join(persist_directory, CURRENT_FILE)
+    if not os.path.exists(pointer):
+        return persist_directory
+    with open(pointer, encoding="utf-8") as f:
+        return os.path.join(persist_directory, f.read().strip())
+
+def _publish_version(persist_directory: str, staging_directory: str, version: str):
+    # Renomeia a pasta temporária para a versão final e troca o CURRENT de forma atômica (os.replace).
+    os.rename(staging_directory, os.path.join(persist_directory, version))
+    pointer = os.path.join(persist_directory, CURRENT_FILE)
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        f.write(version)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer + ".tmp", pointer)
+
+    # Remove as versões antigas. Em Linux/macOS, apagar arquivos ainda mapeados por outro processo é seguro
+    # (o conteúdo só é liberado quando o último mapeamento é fechado); no Windows, a remoção falha e é ignorada.
+    versions = sorted(name for name in os.listdir(persist_directory)
+                      if name.startswith("v") and os.path.isdir(os.path.join(persist_directory, name)))
+    for old in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(persist_directory, old), ignore_errors=True)
+
+
+class LocalANNStore(VectorStore):
+    """
+    VectorStore do LangChain sobre o IVFIndex, com a mesma interface usada pelo nosso código com o Chroma
+    (similarity_search com 'filter' e get(include=["metadatas"])).
+    Os textos e metadados ficam em 'documents.jsonl', ao lado dos arquivos do índice (na pasta da versão).
+    """
+
+    def __init__(self, persist_directory: str, embedding_function, nprobe: int = DEFAULT_NPROBE):
+        self.persist_directory = persist_directory
+        self.embedding_function = embedding_function
+        self.nprobe = nprobe
+        self.version_directory = current_version_directory(persist_directory)
+        self.index = IVFIndex(self.version_directory)
+        self.texts, self.metadatas = [], []
+        with open(os.path.join(self.version_directory, "documents.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                document = json.loads(line)
+                self.texts.append(document["page_content"])
+                self.metadatas.append(document["metadata"])
+        self.ids = [str(i) for i in range(len(self.texts))]
+        self._masks = self._build_masks(INDEXED_METADATA)
+
+    @property
+    def embeddings(self):
+        return self.embedding_function
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, persist_directory: str = "./ann_index",
+                   nlist: int = None, nprobe: int = DEFAULT_NPROBE, **kwargs):
+        """
+        Gera os embeddings, constrói o índice IVF em uma pasta temporária e a publica como a nova
+        versão de 'persist_directory' (quem estiver com a versão anterior aberta não é afetado).
+        """
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        vectors = embedding.embed_documents(texts)
+
+        os.makedirs(persist_directory, exist_ok=True)
+        version = f"v{time.time_ns()}-{os.getpid()}"
+        staging_directory = os.path.join(persist_directory, f".tmp-{version}")
+        IVFIndex.build(vectors, staging_directory, nlist=nlist)
+        with open(os.path.join(staging_directory, "documents.jsonl"), "w", encoding="utf-8") as f:
+            for text, metadata in zip(texts, metadatas):
+                f.write(json.dumps({"page_content": text, "metadata": metadata}, ensure_ascii=False) + "\n")
+        _publish_version(persist_directory, staging_directory, version)
+        return cls(persist_directory, embedding, nprobe=nprobe)
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        # O índice IVF é imutável: adicionar textos significa reconstruí-lo com a coleção completa.
+        # (Rode o setup_chromadb.py novamente em vez de adicionar documentos aos poucos.)
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        rebuilt = self.from_texts(self.texts + texts, self.embedding_function, self.metadatas + list(metadatas),
+                                  persist_directory=self.persist_directory, nlist=self.index.nlist, nprobe=self.nprobe)
+        self.version_directory, self.index = rebuilt.version_directory, rebuilt.index
+        self.texts, self.metadatas, self.ids, self._masks = rebuilt.texts, rebuilt.metadatas, rebuilt.ids, rebuilt._masks
+        return self.ids[-len(texts):] if texts else []
+
+    def memory_bytes(self) -> int:
+        """
+        Estimativa da memória residente da base aberta: centróides, offsets, máscaras de filtro e documents.jsonl.
+        Os vetores (codes/scales/ids) são memory-mapped: ficam no cache de páginas do sistema operacional,
+        que é compartilhado entre os processos e liberado sob demanda, então não entram na conta.
+        """
+        if self.index is None:
+            return 0
+        documents_size = os.path.getsize(os.path.join(self.version_directory, "documents.jsonl"))
+        return (self.index.centroids.nbytes + self.index.offsets.nbytes
+                + sum(mask.nbytes for mask in self._masks.values()) + documents_size)
+
+    def close(self):
+        """
+        Libera a base: solta o índice (desfazendo os memory-maps), os textos e as máscaras.
+        Buscas já em andamento mantêm suas próprias referências e terminam normalmente.
+        """
+        self.index = None
+        self.texts, self.metadatas, self.ids, self._masks = [], [], [], {}
+
+    def get(self, include=None):
+        # Compatível com o Chroma.get(include=["metadatas"]) usado para listar as seções.
+        # As listas são montadas uma vez na abertura da base e não devem ser alteradas por quem chama.
+        return {"ids": self.ids, "metadatas": self.metadatas, "documents": self.texts}
+
+    def _build_masks(self, keys) -> dict:
+        # Máscara booleana por (metadado, valor), calculada na abertura: filtrar por seção não percorre os documentos.
+        ids_by_value = {}
+        for i, metadata in enumerate(self.metadatas):
+            for key in keys:
+                ids_by_value.setdefault((key, metadata.get(key)), []).append(i)
+        masks = {}
+        for key_value, ids in ids_by_value.items():
+            masks[key_value] = np.zeros(len(self.texts), dtype=bool)
+            masks[key_value][ids] = True
+        return masks
+
+    def _mask_for(self, key, value):
+        mask = self._masks.get((key, value))
+        if mask is None:
+            if key in INDEXED_METADATA:
+                return np.zeros(len(self.texts), dtype=bool) # Valor que não existe na base
+            # Metadado não indexado: calcula na primeira vez e guarda para as próximas buscas.
+            mask = np.fromiter((m.get(key) == value for m in self.metadatas), dtype=bool, count=len(self.texts))
+            self._masks[(key, value)] = mask
+        return mask
+
+    def _allowed_mask(self, filter):
+        if not filter:
+            return None
+        masks = [self._mask_for(key, value) for key, value in filter.items()]
+        return masks[0] if len(masks) == 1 else np.logical_and.reduce(masks)
+
+    def similarity_search_by_vector_with_score(self, embedding, k: int = 4, filter: dict = None, nprobe: int = None):
+        # Referências locais: se a base for fechada (close) durante a busca, esta busca termina normalmente.
+        index, texts, metadatas = self.index, self.texts, self.metadatas
+        if index is None:
+            raise ValueError(f"A base em {self.persist_directory} foi fechada.")
+        nprobe = nprobe or self.nprobe
+        allowed = self._allowed_mask(filter)
+        if allowed is not None and not allowed.any():
+            return []
+        ids, scores = index.search(embedding, k=k, nprobe=nprobe, allowed=allowed)
+        # Com filtro, os clusters examinados podem não ter documentos suficientes da seção: busca em todos.
+        if allowed is not None and len(ids) < k and nprobe < index.nlist:
+            ids, scores = index.search(embedding, k=k, nprobe=index.nlist, allowed=allowed)
+        return [(Document(page_content=texts[i], metadata=metadatas[i]), float(score)) for i, score in zip(ids, scores)]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: dict = None, nprobe: int = None, **kwargs):
+        embedding = self.embedding_function.embed_query(query)
+        return self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter, nprobe=nprobe)
+
+    def similarity_search_by_vector(self, embedding, k: int = 4, filter: dict = None, nprobe: int = None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_by_vector_with_score(embedding, k=k, filter=filter, nprobe=nprobe)]
+
+    def similarity_search(self, query: str, k: int = 4, filter: dict = None, nprobe: int = None, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k=k, filter=filter, nprobe=nprobe)]
+
+    def _select_relevance_score_fn(self):
+        # Similaridade de cosseno em [-1, 1] -> relevância em [0, 1].
+        return lambda score: (score + 1.0) / 2.0
@@ -5,12 +5,13 @@ from dotenv import load_dotenv
 import os
 
 # Importações do LangChain
-from langchain_openai import ChatOpenAI
+from provider_gateway import get_chat_model
 from langchain.prompts import PromptTemplate
 from langchain.memory import ConversationBufferMemory
 from langchain_community.tools import SerpAPIWrapper
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.tools import Tool
+from agent_budget import ExecutionBudget, ask_with_budget # Prazo e orçamento de tokens/passos
 
 # --- 2. Preparando o Terreno: Configuração do Ambiente e Chaves de API ---
 load_dotenv() # Carrega as variáveis de ambiente do arquivo .env
@@ -28,11 +29,15 @@ if not SERPAPI_API_KEY:
 
 print("Chaves de API carregadas com sucesso!")
 
+# Orçamento de cada pergunta (AGENT_DEADLINE_S, AGENT_MAX_TOKENS e AGENT_MAX_STEPS no .env; veja agent_budget.py).
+AGENT_BUDGET = ExecutionBudget.from_env()
+
 # --- 3. A Primeira Peça: Conectando-se ao Cérebro (o LLM) ---
 # Inicializa o Modelo de Linguagem (LLM) da OpenAI
 # Usamos 'gpt-3.5-turbo' por ser rápido e eficiente para este exemplo.
 # A 'temperature' controla a aleatoriedade da saída (0.0 para mais determinismo, 1.0 para mais criatividade).
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7, openai_api_key=OPENAI_API_KEY)
+# O timeout impede que uma única chamada ao LLM ultrapasse o prazo da pergunta inteira.
+llm = get_chat_model("gpt-3.5-turbo", temperature=0.7, request_timeout=AGENT_BUDGET.deadline_s)
 
 # --- 4. Dando Olhos e Mãos ao Agente: Criando uma Ferramenta (Tool) ---
 # Inicializa o wrapper da SerpAPI para buscas no Google
@@ -83,7 +88,8 @@ Question: {input}
 # Cria o Agente ReAct (sem memória para este executor)
 agent_no_memory = create_react_agent(llm, tools, prompt_template_no_memory)
 # Cria o Executor do Agente (verbose=True para ver o raciocínio passo a passo)
-agent_executor_no_memory = AgentExecutor(agent=agent_no_memory, tools=tools, verbose=True)
+agent_executor_no_memory = AgentExecutor(agent=agent_no_memory, tools=tools, verbose=True,
+                                         max_iterations=AGENT_BUDGET.max_steps + 1, max_execution_time=AGENT_BUDGET.deadline_s)
 
 
 # --- 6. Adicionando Memória: Lembre-se do Passado para uma Conversa Contínua ---
@@ -128,7 +134,8 @@ memory = ConversationBufferMemory(memory_key="chat_history", return_messages=Tru
 # 6.3. Cria o Agente ReAct com Memória
 agent_with_memory = create_react_agent(llm, tools, prompt_template_with_memory)
 # Cria o Executor do Agente com memória
-agent_executor_with_memory = AgentExecutor(agent=agent_with_memory, tools=tools, verbose=True, memory=memory)
+agent_executor_with_memory = AgentExecutor(agent=agent_with_memory, tools=tools, verbose=True, memory=memory,
+                                           max_iterations=AGENT_BUDGET.max_steps + 1, max_execution_time=AGENT_BUDGET.deadline_s)
 
 
 # --- Bloco Principal de Execução ---
@@ -145,14 +152,14 @@ if __name__ == "__main__":
     print("\n--- Teste do Agente SEM Memória ---")
     try:
         print("\nUsuário: Qual é a capital da Croácia e qual a sua população?")
-        agent_executor_no_memory.invoke({"input": "Qual é a capital da Croácia e qual a sua população?"})
+        ask_with_budget(agent_executor_no_memory, "Qual é a capital da Croácia e qual a sua população?", AGENT_BUDGET)
 
         print("\nUsuário: Qual o resultado de 15 * 23?")
         # O agente tentará usar a ferramenta de busca para isso,
         # pois é a única ferramenta disponível e ele busca por 'informações'.
         # Isso mostra a necessidade de ter ferramentas mais específicas (ex: calculadora)
         # ou prompts mais refinados para direcionar o uso.
-        agent_executor_no_memory.invoke({"input": "Qual o resultado de 15 * 23?"})
+        ask_with_budget(agent_executor_no_memory, "Qual o resultado de 15 * 23?", AGENT_BUDGET)
 
     except Exception as e:
         print(f"Erro ao interagir com o agente sem memória: {e}")
@@ -165,19 +172,19 @@ if __name__ == "__main__":
     try:
         # Primeira pergunta
         print("\nUsuário: Qual a capital da Croácia?")
-        agent_executor_with_memory.invoke({"input": "Qual a capital da Croácia?"})
+        ask_with_budget(agent_executor_with_memory, "Qual a capital da Croácia?", AGENT_BUDGET)
 
         # Segunda pergunta, que depende da primeira
         print("\nUsuário: E qual a moeda usada lá?")
-        agent_executor_with_memory.invoke({"input": "E qual a moeda usada lá?"})
+        ask_with_budget(agent_executor_with_memory, "E qual a moeda usada lá?", AGENT_BUDGET)
         
         # Terceira pergunta, mostrando que ele ainda mantém o contexto
         print("\nUsuário: Qual o principal ponto turístico de lá?")
-        agent_executor_with_memory.invoke({"input": "Qual o principal ponto turístico de lá?"})
+        ask_with_budget(agent_executor_with_memory, "Qual o principal ponto turístico de lá?", AGENT_BUDGET)
 
         # Quarta pergunta, um novo tópico para ver como o agente se adapta
         print("\nUsuário: Qual a população do Canadá?")
-        agent_executor_with_memory.invoke({"input": "Qual a população do Canadá?"})
+        ask_with_budget(agent_executor_with_memory, "Qual a população do Canadá?", AGENT_BUDGET)
 
 
     except Exception as e:
@@ -5,12 +5,13 @@ from dotenv import load_dotenv
 import os
 
 # Importações do LangChain
-from langchain_openai import ChatOpenAI
+from provider_gateway import get_chat_model
 from langchain.prompts import PromptTemplate
 from langchain.memory import ConversationBufferMemory
 from langchain_community.tools import SerpAPIWrapper
 from langchain.agents import AgentExecutor, create_react_agent
 from langchain.tools import Tool
+from agent_budget import ExecutionBudget, ask_with_budget # Prazo e orçamento de tokens/passos
 
 # Importa as funções do módulo de ferramentas que acabamos de criar
 from tools_module import (
@@ -37,8 +38,12 @@ if not SERPAPI_API_KEY:
 
 print("Chaves de API carregadas com sucesso!")
 
+# Orçamento de cada pergunta (AGENT_DEADLINE_S, AGENT_MAX_TOKENS e AGENT_MAX_STEPS no .env; veja agent_budget.py).
+AGENT_BUDGET = ExecutionBudget.from_env()
+
 # --- 3. A Primeira Peça: Conectando-se ao Cérebro (o LLM) ---
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7, openai_api_key=OPENAI_API_KEY)
+# O timeout impede que uma única chamada ao LLM ultrapasse o prazo da pergunta inteira.
+llm = get_chat_model("gpt-3.5-turbo", temperature=0.7, request_timeout=AGENT_BUDGET.deadline_s)
 
 # --- 4. Dando Olhos e Mãos ao Agente: Criando Ferramentas (Tools) ---
 # Lista de ferramentas que o agente poderá usar
@@ -116,7 +121,8 @@ memory = ConversationBufferMemory(memory_key="chat_history", return_messages=Tru
 
 # Cria o Agente ReAct com Memória
 agent_with_memory = create_react_agent(llm, tools, prompt_template_with_memory)
-agent_executor_with_memory = AgentExecutor(agent=agent_with_memory, tools=tools, verbose=True, memory=memory)
+agent_executor_with_memory = AgentExecutor(agent=agent_with_memory, tools=tools, verbose=True, memory=memory,
+                                           max_iterations=AGENT_BUDGET.max_steps + 1, max_execution_time=AGENT_BUDGET.deadline_s)
 
 
 # --- Bloco Principal de Execução ---
@@ -136,7 +142,7 @@ if __name__ == "__main__":
     # --- Exemplo 1: Enviar E-mail ---
     try:
         print("\nUsuário: Por favor, envie um e-mail para 'test@example.com' com o assunto 'Relatório Diário' e o corpo 'Segue o relatório de vendas de hoje.'.")
-        agent_executor_with_memory.invoke({"input": "Por favor, envie um e-mail para 'test@example.com' com o assunto 'Relatório Diário' e o corpo 'Segue o relatório de vendas de hoje.'."})
+        ask_with_budget(agent_executor_with_memory, "Por favor, envie um e-mail para 'test@example.com' com o assunto 'Relatório Diário' e o corpo 'Segue o relatório de vendas de hoje.'.", AGENT_BUDGET)
     except Exception as e:
         print(f"Erro ao executar ação de e-mail: {e}")
 
@@ -153,21 +159,21 @@ if __name__ == "__main__":
         # Para que o LLM não precise calcular a data, podemos passá-la diretamente no prompt.
         # Ou podemos ter uma ferramenta 'get_current_date'
         print(f"   (Assumindo amanhã é {tomorrow.strftime('%Y-%m-%d')})")
-        agent_executor_with_memory.invoke({"input": f"Agende uma reunião 'Alinhamento de Projeto' para {start_time} a {end_time}, com 'ana@empresa.com, joao@empresa.com'."})
+        ask_with_budget(agent_executor_with_memory, f"Agende uma reunião 'Alinhamento de Projeto' para {start_time} a {end_time}, com 'ana@empresa.com, joao@empresa.com'.", AGENT_BUDGET)
     except Exception as e:
         print(f"Erro ao executar ação de calendário: {e}")
         
     # --- Exemplo 3: Verificar Disponibilidade no Calendário ---
     try:
         print("\nUsuário: Verifique se 'carlos@empresa.com, maria@empresa.com' estão disponíveis entre '2024-12-10 14:00' e '2024-12-10 15:00'.")
-        agent_executor_with_memory.invoke({"input": "Verifique se 'carlos@empresa.com, maria@empresa.com' estão disponíveis entre '2024-12-10 14:00' e '2024-12-10 15:00'."})
+        ask_with_budget(agent_executor_with_memory, "Verifique se 'carlos@empresa.com, maria@empresa.com' estão disponíveis entre '2024-12-10 14:00' e '2024-12-10 15:00'.", AGENT_BUDGET)
     except Exception as e:
         print(f"Erro ao verificar disponibilidade: {e}")
 
     # --- Exemplo 4: Postar Mensagem no Slack ---
     try:
         print("\nUsuário: Por favor, poste a mensagem 'Lembrete: reunião de equipe às 14h' no canal 'geral' do Slack.")
-        agent_executor_with_memory.invoke({"input": "Por favor, poste a mensagem 'Lembrete: reunião de equipe às 14h' no canal 'geral' do Slack."})
+        ask_with_budget(agent_executor_with_memory, "Por favor, poste a mensagem 'Lembrete: reunião de equipe às 14h' no canal 'geral' do Slack.", AGENT_BUDGET)
     except Exception as e:
         print(f"Erro ao executar ação no Slack: {e}")
 
@@ -183,7 +189,7 @@ if __name__ == "__main__":
         attendees_for_smart_schedule = "julia@empresa.com, pedro@empresa.com"
         
         print(f"\nUsuário: Agende uma reunião de 'Brainstorm de Marketing' para a próxima semana, no dia {next_week.strftime('%Y-%m-%d')}, das 14:00 às 15:00, com {attendees_for_smart_schedule}. Se todos estiverem disponíveis, envie também um e-mail de confirmação.")
-        agent_executor_with_memory.invoke({"input": f"Agende uma reunião de 'Brainstorm de Marketing' para a próxima semana, no dia {next_week.strftime('%Y-%m-%d')}, das 14:00 às 15:00, com {attendees_for_smart_schedule}. Se todos estiverem disponíveis, envie também um e-mail de confirmação."})
+        ask_with_budget(agent_executor_with_memory, f"Agende uma reunião de 'Brainstorm de Marketing' para a próxima semana, no dia {next_week.strftime('%Y-%m-%d')}, das 14:00 às 15:00, com {attendees_for_smart_schedule}. Se todos estiverem disponíveis, envie também um e-mail de confirmação.", AGENT_BUDGET)
 
     except Exception as e:
         print(f"Erro na demonstração de agendamento inteligente: {e}")
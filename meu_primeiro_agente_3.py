@@ -6,7 +6,7 @@ import os
 import datetime # Adicionado para uso com datas no exemplo
 
 # Importações do LangChain
-from langchain_openai import ChatOpenAI
+from provider_gateway import get_chat_model, gateway_stats
 from langchain.prompts import PromptTemplate
 from langchain.memory import ConversationBufferMemory
 from langchain_community.tools import SerpAPIWrapper
@@ -19,8 +19,12 @@ from tools_module import (
     create_calendar_event_function,
     check_calendar_availability_function,
     post_slack_message_function,
-    query_knowledge_base_function # Nova função importada!
+    query_knowledge_base_function, # Nova função importada!
+    prefetch_knowledge_base, discard_prefetch, prefetch_stats # Busca antecipada na base de conhecimento
 )
+from tool_cache import tool_cache_stats # Estatísticas do cache de resultados das ferramentas
+from agent_budget import ExecutionBudget, ask_with_budget, run_tool_with_budget, budget_metrics # Prazo e orçamento de tokens/passos
+from intent_router import IntentRouter # Atalho para perguntas simples, sem o loop ReAct
 
 # --- 2. Preparando o Terreno: Configuração do Ambiente e Chaves de API ---
 load_dotenv() # Carrega as variáveis de ambiente do arquivo .env
@@ -38,50 +42,61 @@ if not SERPAPI_API_KEY:
 
 print("Chaves de API carregadas com sucesso!")
 
+# Unidade de negócio (tenant) desta sessão: define qual base de conhecimento o agente consulta.
+# Crie a base de cada tenant com: python setup_chromadb.py <tenant> <arquivo>
+TENANT_ID = os.getenv("TENANT_ID", "default")
+
+# Orçamento de cada pergunta (AGENT_DEADLINE_S, AGENT_MAX_TOKENS e AGENT_MAX_STEPS no .env; veja agent_budget.py).
+AGENT_BUDGET = ExecutionBudget.from_env()
+
 # --- 3. A Primeira Peça: Conectando-se ao Cérebro (o LLM) ---
-llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0.7, openai_api_key=OPENAI_API_KEY)
+# O timeout impede que uma única chamada ao LLM ultrapasse o prazo da pergunta inteira.
+llm = get_chat_model("gpt-3.5-turbo", temperature=0.7, request_timeout=AGENT_BUDGET.deadline_s)
 
 # --- 4. Dando Olhos e Mãos ao Agente: Criando Ferramentas (Tools) ---
 # Lista de ferramentas que o agente poderá usar
+# As ferramentas ficam em uma função para que cada tenant (ou cada execução em lote) tenha a sua lista.
 
-tools = [
-    # Ferramenta de Busca na Web (do Capítulo 5)
-    Tool(
-        name="Google Search",
-        func=SerpAPIWrapper(serpapi_api_key=SERPAPI_API_KEY).run if SERPAPI_API_KEY else lambda x: "SerpAPI Key não configurada, busca na web indisponível.",
-        description="Útil para buscar informações gerais na internet, sobre pessoas, lugares, eventos, definições e fatos atuais."
-    ),
-    # Ferramenta para Envio de E-mail (do Capítulo 6)
-    Tool(
-        name="Send Email",
-        func=send_email_function,
-        description="Útil para enviar e-mails. Parâmetros: recipient_email (str), subject (str), body (str)."
-    ),
-    # Ferramenta para Criar Evento de Calendário (do Capítulo 6)
-    Tool(
-        name="Create Calendar Event",
-        func=create_calendar_event_function,
-        description="Útil para agendar um evento no calendário. Parâmetros: title (str), start_time (str YYYY-MM-DD HH:MM), end_time (str YYYY-MM-DD HH:MM), attendees (str, e-mails separados por vírgula), description (str, opcional)."
-    ),
-    # Ferramenta para Verificar Disponibilidade no Calendário (do Capítulo 6)
-    Tool(
-        name="Check Calendar Availability",
-        func=check_calendar_availability_function,
-        description="Útil para verificar a disponibilidade de participantes para um evento. Parâmetros: start_time (str YYYY-MM-DD HH:MM), end_time (str YYYY-MM-DD HH:MM), attendees (str, e-mails separados por vírgula)."
-    ),
-    # Ferramenta para Postar no Slack (do Capítulo 6)
-    Tool(
-        name="Post Slack Message",
-        func=post_slack_message_function,
-        description="Útil para enviar mensagens para canais do Slack. Parâmetros: channel (str, nome do canal sem #), message (str)."
-    ),
-    # NOVA Ferramenta para Consultar a Base de Conhecimento (deste capítulo!)
-    Tool(
-        name="Query Internal Knowledge Base",
-        func=query_knowledge_base_function,
-        description="Útil para consultar informações internas da empresa, como políticas, FAQs ou documentos. Use para perguntas sobre regras, procedimentos ou informações específicas da organização."
-    )
-]
+def build_tools(tenant: str = TENANT_ID) -> list:
+    return [
+        # Ferramenta de Busca na Web (do Capítulo 5)
+        Tool(
+            name="Google Search",
+            func=SerpAPIWrapper(serpapi_api_key=SERPAPI_API_KEY).run if SERPAPI_API_KEY else lambda x: "SerpAPI Key não configurada, busca na web indisponível.",
+            description="Útil para buscar informações gerais na internet, sobre pessoas, lugares, eventos, definições e fatos atuais."
+        ),
+        # Ferramenta para Envio de E-mail (do Capítulo 6)
+        Tool(
+            name="Send Email",
+            func=send_email_function,
+            description="Útil para enviar e-mails. Parâmetros: recipient_email (str), subject (str), body (str)."
+        ),
+        # Ferramenta para Criar Evento de Calendário (do Capítulo 6)
+        Tool(
+            name="Create Calendar Event",
+            func=create_calendar_event_function,
+            description="Útil para agendar um evento no calendário. Parâmetros: title (str), start_time (str YYYY-MM-DD HH:MM), end_time (str YYYY-MM-DD HH:MM), attendees (str, e-mails separados por vírgula), description (str, opcional)."
+        ),
+        # Ferramenta para Verificar Disponibilidade no Calendário (do Capítulo 6)
+        Tool(
+            name="Check Calendar Availability",
+            func=check_calendar_availability_function,
+            description="Útil para verificar a disponibilidade de participantes para um evento. Parâmetros: start_time (str YYYY-MM-DD HH:MM), end_time (str YYYY-MM-DD HH:MM), attendees (str, e-mails separados por vírgula)."
+        ),
+        # Ferramenta para Postar no Slack (do Capítulo 6)
+        Tool(
+            name="Post Slack Message",
+            func=post_slack_message_function,
+            description="Útil para enviar mensagens para canais do Slack. Parâmetros: channel (str, nome do canal sem #), message (str)."
+        ),
+        # NOVA Ferramenta para Consultar a Base de Conhecimento (deste capítulo!)
+        Tool(
+            name="Query Internal Knowledge Base",
+            # Com o parâmetro 'callbacks', a Tool repassa os callbacks da execução (orçamento) à ferramenta.
+            func=lambda query, callbacks=None: query_knowledge_base_function(query, tenant=tenant, callbacks=callbacks),
+            description="Útil para consultar informações internas da empresa, como políticas, FAQs ou documentos. Use para perguntas sobre regras, procedimentos ou informações específicas da organização."
+        )
+    ]
 
 # --- 5. Montando o Agente: O Coração do Nosso Primeiro Sistema Autônomo ---
 
@@ -119,12 +134,66 @@ Question: {input}
 {agent_scratchpad}
 """)
 
-# Inicializa a Memória (ConversationBufferMemory)
-memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+def build_agent_executor(tenant: str = TENANT_ID, verbose: bool = True) -> AgentExecutor:
+    """
+    Cria o Agente ReAct e um executor novo, com sua própria memória (ConversationBufferMemory)
+    e as ferramentas do tenant informado.
+    Usado pelo batch_runner.py para rodar cada pergunta isolada das demais.
+    """
+    tenant_tools = build_tools(tenant)
+    tenant_memory = ConversationBufferMemory(memory_key="chat_history", return_messages=True)
+    agent = create_react_agent(llm, tenant_tools, prompt_template_with_memory)
+    # max_iterations/max_execution_time são uma segunda barreira, caso o executor seja chamado sem run_with_budget().
+    return AgentExecutor(agent=agent, tools=tenant_tools, verbose=verbose, memory=tenant_memory,
+                         max_iterations=AGENT_BUDGET.max_steps + 1, max_execution_time=AGENT_BUDGET.deadline_s)
+
+# Cria o Agente ReAct com Memória (e ferramentas) para o tenant desta sessão
+agent_executor_with_memory = build_agent_executor(TENANT_ID)
+
+# Roteador de intenções: perguntas que claramente são sobre a base interna vão direto para a ferramenta,
+# economizando as várias chamadas ao LLM do loop ReAct. Desative com FAST_PATH_ENABLED=0.
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "1") == "1"
+intent_router = IntentRouter(build_tools(TENANT_ID))
 
-# Cria o Agente ReAct com Memória
-agent_with_memory = create_react_agent(llm, tools, prompt_template_with_memory)
-agent_executor_with_memory = AgentExecutor(agent=agent_with_memory, tools=tools, verbose=True, memory=memory)
+# Busca antecipada: para perguntas que podem envolver a base interna, a recuperação começa junto com o
+# primeiro "Thought" do LLM, em vez de esperar o agente escolher a ferramenta. Desative com KB_PREFETCH_ENABLED=0.
+KB_PREFETCH_ENABLED = os.getenv("KB_PREFETCH_ENABLED", "1") == "1"
+
+def ask(question: str, executor: AgentExecutor = None, tenant: str = TENANT_ID) -> dict:
+    """
+    Envia uma pergunta ao agente respeitando o orçamento (prazo, tokens e passos) configurado acima.
+    Perguntas simples, de uma única ferramenta, são respondidas pelo atalho do roteador de intenções.
+    Args:
+        tenant (str): O tenant das ferramentas do executor (usado pela busca antecipada na base).
+    """
+    executor = executor or agent_executor_with_memory
+    tool_name = intent_router.route(question) if FAST_PATH_ENABLED else None
+    if tool_name:
+        tool = next(t for t in executor.tools if t.name == tool_name)
+        # O atalho também respeita o orçamento: os tokens da ferramenta são contados e a execução entra nas métricas.
+        result = run_tool_with_budget(tool.func, question, AGENT_BUDGET)
+        # Se a ferramenta falhar, a pergunta segue normalmente para o agente completo.
+        if not result["output"].startswith("Erro"):
+            # Registra a troca na memória, para que as próximas perguntas (no loop completo) tenham o contexto.
+            executor.memory.save_context({"input": question}, {"output": result["output"]})
+            if result["budget_exceeded"]:
+                print(f"[Orçamento atingido: {result['budget_exceeded']}] {result['output']}")
+            else:
+                print(f"[Atalho: {tool_name}] {result['output']}")
+            return {"input": question, **result, "fast_path": tool_name}
+
+    # Só antecipa a busca quando a pergunta tem algum termo ligado à base interna (as demais nem a consultariam).
+    prefetch = KB_PREFETCH_ENABLED and intent_router.scores(question).get("Query Internal Knowledge Base", 0.0) > 0
+    if prefetch:
+        prefetch_knowledge_base(question, tenant)
+
+    try:
+        result = ask_with_budget(executor, question, AGENT_BUDGET)
+    finally:
+        if prefetch:
+            discard_prefetch(question, tenant) # Se o agente não usou a busca antecipada, ela é descartada.
+    result["fast_path"] = None
+    return result
 
 
 # --- Bloco Principal de Execução ---
@@ -144,16 +213,16 @@ if __name__ == "__main__":
     # --- Exemplo 1: Perguntar sobre Políticas Internas ---
     try:
         print("\nUsuário: Qual a política de férias da empresa?")
-        agent_executor_with_memory.invoke({"input": "Qual a política de férias da empresa?"})
+        ask("Qual a política de férias da empresa?")
 
         print("\nUsuário: Existe algum subsídio para desenvolvimento profissional?")
-        agent_executor_with_memory.invoke({"input": "Existe algum subsídio para desenvolvimento profissional?"})
+        ask("Existe algum subsídio para desenvolvimento profissional?")
         
         print("\nUsuário: Qual o limite de reembolso para refeições?")
-        agent_executor_with_memory.invoke({"input": "Qual o limite de reembolso para refeições?"})
+        ask("Qual o limite de reembolso para refeições?")
 
         print("\nUsuário: Qual o modelo de trabalho adotado pela empresa?")
-        agent_executor_with_memory.invoke({"input": "Qual o modelo de trabalho adotado pela empresa?"})
+        ask("Qual o modelo de trabalho adotado pela empresa?")
 
     except Exception as e:
         print(f"Erro ao interagir com o agente e base de conhecimento: {e}")
@@ -162,7 +231,7 @@ if __name__ == "__main__":
     print("\n--- Testando combinação de conhecimento interno e externo ---")
     try:
         print("\nUsuário: Qual a política de trabalho remoto e quem é o atual CEO da OpenAI?")
-        agent_executor_with_memory.invoke({"input": "Qual a política de trabalho remoto e quem é o atual CEO da OpenAI?"})
+        ask("Qual a política de trabalho remoto e quem é o atual CEO da OpenAI?")
     except Exception as e:
         print(f"Erro ao combinar conhecimentos: {e}")
 
@@ -172,7 +241,7 @@ if __name__ == "__main__":
     # --- Exemplo 2: Enviar E-mail ---
     try:
         print("\nUsuário: Por favor, envie um e-mail para 'test@example.com' com o assunto 'Relatório Diário' e o corpo 'Segue o relatório de vendas de hoje.'.")
-        agent_executor_with_memory.invoke({"input": "Por favor, envie um e-mail para 'test@example.com' com o assunto 'Relatório Diário' e o corpo 'Segue o relatório de vendas de hoje.'."})
+        ask("Por favor, envie um e-mail para 'test@example.com' com o assunto 'Relatório Diário' e o corpo 'Segue o relatório de vendas de hoje.'.")
     except Exception as e:
         print(f"Erro ao executar ação de e-mail: {e}")
 
@@ -183,6 +252,32 @@ if __name__ == "__main__":
         start_time = tomorrow.strftime('%Y-%m-%d 10:00')
         end_time = tomorrow.strftime('%Y-%m-%d 11:00')
         print(f"\nUsuário: Agende uma reunião 'Alinhamento de Projeto' para {start_time} a {end_time}, com 'ana@empresa.com, joao@empresa.com'.")
-        agent_executor_with_memory.invoke({"input": f"Agende uma reunião 'Alinhamento de Projeto' para {start_time} a {end_time}, com 'ana@empresa.com, joao@empresa.com'."})
+        ask(f"Agende uma reunião 'Alinhamento de Projeto' para {start_time} a {end_time}, com 'ana@empresa.com, joao@empresa.com'.")
     except Exception as e:
         print(f"Erro ao executar ação de calendário: {e}")
+
+    # --- Métricas de orçamento: com que frequência as perguntas estouram prazo, tokens ou passos ---
+    print("\n--- Orçamento de Execução ---")
+    metrics = budget_metrics()
+    print(f"Execuções: {metrics['runs']} | Concluídas: {metrics['completed']} | Prazo: {metrics['deadline']} | "
+          f"Tokens: {metrics['tokens']} | Passos: {metrics['steps']} (taxa de estouro: {metrics['exceeded_rate']:.0%})")
+
+    # --- Roteador de intenções: quantas perguntas pularam o loop ReAct ---
+    router_stats = intent_router.route_stats()
+    print(f"Atalho (sem loop ReAct): {router_stats['fast_path']} | Agente completo: {router_stats['agent']} "
+          f"(taxa de atalho: {router_stats['fast_path_rate']:.0%})")
+
+    # --- Busca antecipada: quantas recuperações iniciadas junto com a pergunta foram aproveitadas pelo agente ---
+    kb_prefetch = prefetch_stats()
+    print(f"Buscas antecipadas: {kb_prefetch['started']} | Aproveitadas: {kb_prefetch['hits']} | "
+          f"Descartadas: {kb_prefetch['wasted']} (taxa de aproveitamento: {kb_prefetch['hit_rate']:.0%})")
+
+    # --- Gateway do provedor: requisições, erros 429 e tempo de espera no limitador de taxa ---
+    stats = gateway_stats()
+    print(f"Requisições à OpenAI: {stats['requests']} | 429: {stats['rate_limited_429']} | "
+          f"Espera no limitador: {stats['throttle_wait_s']:.1f}s | Lote médio de embeddings: {stats['avg_embedding_batch']:.1f}")
+
+    # --- Estatísticas do cache das ferramentas puras ---
+    print("\n--- Cache de Ferramentas (hits/misses) ---")
+    for tool_name, info in tool_cache_stats().items():
+        print(f"{tool_name}: {info['hits']} hits, {info['misses']} misses (taxa de acerto: {info['hit_rate']:.0%})")
@@ -0,0 +1,290 @@
+# provider_gateway.py
+# Gateway único para o provedor de LLM (OpenAI), compartilhado por agentes, ferramentas, indexador e Crew.
+#
+# Antes, cada script (e cada chamada do query_knowledge_base_function) criava seus próprios ChatOpenAI e
+# OpenAIEmbeddings: nenhuma conexão HTTP era reaproveitada e cada processo respeitava (ou não) os limites
+# do provedor por conta própria, gerando rajadas de erros 429 e tempestades de retentativas. Aqui:
+# - Todos os clientes usam o mesmo httpx.Client (e, nas chamadas assíncronas - ainvoke, Crew -, o mesmo
+#   httpx.AsyncClient), com um pool de conexões reaproveitadas (keep-alive).
+# - Toda requisição passa por um "token bucket" gravado em um SQLite local, compartilhado entre processos:
+#   um limite de requisições por minuto e um de tokens por minuto, valendo para todos os workers da máquina.
+# - Backoff adaptativo (AIMD): a cada 429 a vazão permitida cai pela metade (e todos respeitam o Retry-After);
+#   a cada sucesso ela volta a subir aos poucos, até o limite configurado.
+# - Chamadas embed_query() de várias threads ao mesmo tempo são agrupadas em uma única requisição (micro-batch).
+#
+# Uso:
+#   from provider_gateway import get_chat_model, get_embeddings
+#   llm = get_chat_model("gpt-3.5-turbo", temperature=0.7)
+#   embeddings = get_embeddings()
+
+import asyncio
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+import httpx
+from langchain_core.embeddings import Embeddings
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+# Limites do provedor (ajuste conforme o seu plano na OpenAI) e local do estado compartilhado.
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", "500"))       # Requisições por minuto
+OPENAI_TPM = float(os.getenv("OPENAI_TPM", "200000"))    # Tokens por minuto (estimados pelo tamanho da requisição)
+# O banco fica ao lado deste arquivo (caminho absoluto): workers iniciados de pastas diferentes usam o mesmo bucket.
+# Ao trocar com PROVIDER_GATEWAY_DB, use também um caminho absoluto.
+GATEWAY_DB = os.getenv("PROVIDER_GATEWAY_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".provider_gateway.db"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "rate_limited_429": 0, "throttle_wait_s": 0.0, "embedding_batches": 0, "embedding_queries": 0}
+
+
+def _count(name: str, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+def gateway_stats() -> dict:
+    """Requisições feitas, quantos 429 recebemos, tempo total de espera no limitador e tamanho médio dos batches."""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["avg_embedding_batch"] = stats["embedding_queries"] / stats["embedding_batches"] if stats["embedding_batches"] else 0.0
+    return stats
+
+
+# --- 1. Limitador de Taxa Compartilhado entre Processos (Token Bucket em SQLite) ---
+
+class SharedTokenBucket:
+    """
+    Token bucket cujo estado (tokens disponíveis e vazão atual) fica em uma tabela SQLite.
+    Cada processo abre o mesmo arquivo; as transações 'BEGIN IMMEDIATE' garantem que só um processo
+    por vez atualiza o bucket, então o limite vale para a soma de todos os workers.
+    """
+
+    def __init__(self, name: str, rate_per_minute: float, path: str = GATEWAY_DB, burst_seconds: float = 10.0,
+                 min_rate_fraction: float = 0.05):
+        self.name = name
+        self.max_rate = rate_per_minute / 60.0               # Vazão máxima, por segundo
+        self.min_rate = self.max_rate * min_rate_fraction    # Piso do backoff adaptativo
+        self.capacity = max(1.0, self.max_rate * burst_seconds)
+        self.path = path
+        self._local = threading.local()
+        with self._transaction() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL, rate REAL, "
+                       "updated REAL, blocked_until REAL)")
+            db.execute("INSERT OR IGNORE INTO buckets VALUES (?, ?, ?, ?, 0)",
+                       (name, self.capacity, self.max_rate, time.time()))
+
+    def _connection(self):
+        # Uma conexão por thread (conexões SQLite não devem ser compartilhadas entre threads).
+        if not hasattr(self._local, "db"):
+            self._local.db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        return self._local.db
+
+    class _Transaction:
+        def __init__(self, db):
+            self.db = db
+        def __enter__(self):
+            self.db.execute("BEGIN IMMEDIATE")
+            return self.db
+        def __exit__(self, exc_type, exc, tb):
+            self.db.execute("ROLLBACK" if exc_type else "COMMIT")
+
+    def _transaction(self):
+        return self._Transaction(self._connection())
+
+    def acquire(self, cost: float = 1.0):
+        """Bloqueia até haver 'cost' tokens disponíveis no bucket compartilhado."""
+        cost = min(cost, self.capacity)
+        waited = 0.0
+        while True:
+            with self._transaction() as db:
+                tokens, rate, updated, blocked_until = db.execute(
+                    "SELECT tokens, rate, updated, blocked_until FROM buckets WHERE name = ?", (self.name,)).fetchone()
+                now = time.time()
+                tokens = min(self.capacity, tokens + (now - updated) * rate)
+                if now >= blocked_until and tokens >= cost:
+                    db.execute("UPDATE buckets SET tokens = ?, updated = ? WHERE name = ?", (tokens - cost, now, self.name))
+                    if waited:
+                        _count("throttle_wait_s", waited)
+                    return
+                db.execute("UPDATE buckets SET tokens = ?, updated = ? WHERE name = ?", (tokens, now, self.name))
+                wait = max(blocked_until - now, (cost - tokens) / rate)
+            # Jitter: evita que todos os processos acordem ao mesmo tempo e disputem o bucket.
+            wait = min(wait, 5.0) * random.uniform(1.0, 1.2)
+            time.sleep(wait)
+            waited += wait
+
+    def on_rate_limited(self, retry_after: float = None):
+        """Recebemos um 429: reduz a vazão pela metade e pausa todos os processos pelo Retry-After."""
+        with self._transaction() as db:
+            now = time.time()
+            db.execute("UPDATE buckets SET rate = MAX(?, rate * 0.5), tokens = 0, updated = ?, "
+                       "blocked_until = MAX(blocked_until, ?) WHERE name = ?",
+                       (self.min_rate, now, now + (retry_after or 1.0), self.name))
+
+    def on_success(self):
+        """Sucesso: aumenta a vazão aos poucos (5% do máximo), até o limite configurado."""
+        with self._transaction() as db:
+            db.execute("UPDATE buckets SET rate = MIN(?, rate + ?) WHERE name = ? AND rate < ?",
+                       (self.max_rate, self.max_rate * 0.05, self.name, self.max_rate))
+
+
+# --- 2. Cliente HTTP Compartilhado (Pool de Conexões + Limitador) ---
+
+_request_bucket = None
+_token_bucket = None
+_http_client = None
+_async_http_client = None
+_client_lock = threading.Lock()
+
+def _before_request(request: httpx.Request):
+    # Estimativa de tokens da requisição: ~4 bytes por token do corpo enviado.
+    try:
+        body_size = len(request.content)
+    except httpx.RequestNotRead:
+        body_size = 0
+    _request_bucket.acquire(1)
+    _token_bucket.acquire(max(1, body_size // 4))
+    _count("requests")
+
+def _after_response(response: httpx.Response):
+    if response.status_code == 429:
+        _count("rate_limited_429")
+        try:
+            retry_after = float(response.headers.get("retry-after", "1"))
+        except ValueError:
+            retry_after = 1.0
+        _request_bucket.on_rate_limited(retry_after)
+        _token_bucket.on_rate_limited(retry_after)
+    elif response.status_code < 400:
+        _request_bucket.on_success()
+        _token_bucket.on_success()
+
+async def _before_request_async(request: httpx.Request):
+    # O limitador bloqueia (SQLite + sleep): roda em uma thread para não travar o event loop.
+    await asyncio.to_thread(_before_request, request)
+
+async def _after_response_async(response: httpx.Response):
+    await asyncio.to_thread(_after_response, response)
+
+def _create_buckets():
+    # Chamar com _client_lock: os dois clientes (síncrono e assíncrono) compartilham os mesmos buckets.
+    global _request_bucket, _token_bucket
+    if _request_bucket is None:
+        _request_bucket = SharedTokenBucket("openai_requests", OPENAI_RPM)
+        _token_bucket = SharedTokenBucket("openai_tokens", OPENAI_TPM)
+
+def get_http_client() -> httpx.Client:
+    """O httpx.Client único do processo: conexões keep-alive reaproveitadas por todos os modelos."""
+    global _http_client
+    with _client_lock:
+        if _http_client is None:
+            _create_buckets()
+            _http_client = httpx.Client(
+                limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                event_hooks={"request": [_before_request], "response": [_after_response]},
+            )
+        return _http_client
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    O httpx.AsyncClient único do processo, usado por ainvoke/astream e pelos caminhos assíncronos da Crew,
+    com o mesmo limitador de taxa do cliente síncrono.
+    Obs: um AsyncClient fica ligado ao event loop em que é usado pela primeira vez; use um único loop por processo.
+    """
+    global _async_http_client
+    with _client_lock:
+        if _async_http_client is None:
+            _create_buckets()
+            _async_http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS),
+                timeout=httpx.Timeout(60.0, connect=10.0),
+                event_hooks={"request": [_before_request_async], "response": [_after_response_async]},
+            )
+        return _async_http_client
+
+
+# --- 3. Modelos Compartilhados ---
+
+_chat_models = {}
+
+def get_chat_model(model: str = "gpt-3.5-turbo", temperature: float = 0.7, **kwargs) -> ChatOpenAI:
+    """
+    Retorna o ChatOpenAI compartilhado para esta configuração (criado só na primeira vez).
+    Argumentos extras (ex: request_timeout) são repassados ao ChatOpenAI.
+    """
+    key = (model, temperature, tuple(sorted(kwargs.items())))
+    with _client_lock:
+        if key in _chat_models:
+            return _chat_models[key]
+    llm = ChatOpenAI(model=model, temperature=temperature, openai_api_key=os.getenv("OPENAI_API_KEY"),
+                     http_client=get_http_client(), http_async_client=get_async_http_client(), **kwargs)
+    with _client_lock:
+        return _chat_models.setdefault(key, llm)
+
+
+class MicroBatchingEmbeddings(Embeddings):
+    """
+    Agrupa as chamadas embed_query() feitas ao mesmo tempo (por threads diferentes) em uma única
+    requisição embed_documents(), esperando no máximo 'max_wait_s' para formar o lote.
+    """
+
+    def __init__(self, inner: Embeddings, max_batch: int = 64, max_wait_s: float = 0.01):
+        self.inner = inner
+        self.max_batch = max_batch
+        self.max_wait_s = max_wait_s
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def embed_documents(self, texts):
+        # Listas de documentos (ex: no indexador) já são enviadas em lote pelo OpenAIEmbeddings.
+        return self.inner.embed_documents(texts)
+
+    def embed_query(self, text):
+        future = Future()
+        self._queue.put((text, future))
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait_s
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            _count("embedding_batches")
+            _count("embedding_queries", len(batch))
+            try:
+                vectors = self.inner.embed_documents([text for text, _ in batch])
+                for (_, future), vector in zip(batch, vectors):
+                    future.set_result(vector)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+_embeddings = None
+
+def get_embeddings() -> MicroBatchingEmbeddings:
+    """Retorna o modelo de embeddings compartilhado (com micro-batching das consultas)."""
+    global _embeddings
+    http_client, http_async_client = get_http_client(), get_async_http_client()
+    with _client_lock:
+        if _embeddings is None:
+            _embeddings = MicroBatchingEmbeddings(
+                OpenAIEmbeddings(openai_api_key=os.getenv("OPENAI_API_KEY"), http_client=http_client,
+                                 http_async_client=http_async_client),
+            )
+    return _embeddings
@@ -2,10 +2,11 @@
 
 from dotenv import load_dotenv
 import os
-from langchain_openai import OpenAIEmbeddings
+import sys
+from provider_gateway import get_embeddings
 from langchain_community.document_loaders import TextLoader
-from langchain_text_splitters import CharacterTextSplitter
 from langchain_community.vectorstores import Chroma
+from knowledge_base import split_by_sections, tenant_persist_directory, DEFAULT_TENANT # Divisão por seções e pastas por tenant
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -17,27 +18,42 @@ if not OPENAI_API_KEY:
     print("Esta chave é necessária para gerar embeddings para a base de conhecimento.")
     exit()
 
+# Cada unidade de negócio (tenant) tem sua própria base, com suas próprias políticas.
+# Uso: python setup_chromadb.py [tenant] [arquivo]
+# Sem argumentos, indexa o politicas_empresa.txt no tenant padrão (./chroma_db).
+tenant = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_TENANT
+source_file = sys.argv[2] if len(sys.argv) > 2 else "politicas_empresa.txt"
+
 # 1. Carregar documentos
 # Opcional: Instale 'unstructured' para suportar mais tipos de arquivos (PDFs, DOCX)
 # pip install unstructured
-loader = TextLoader("politicas_empresa.txt")
+loader = TextLoader(source_file)
 documents = loader.load()
 
 # 2. Dividir documentos em chunks menores
 # Isso é importante porque os embeddings funcionam melhor com pedaços menores e o LLM tem limite de contexto.
-text_splitter = CharacterTextSplitter(chunk_size=1000, chunk_overlap=0)
-docs = text_splitter.split_documents(documents)
+# Em vez de cortar a cada 1000 caracteres, dividimos nos títulos das seções ("Política de Férias:", ...).
+# Cada chunk guarda o título da sua seção no metadado 'section', usado depois para filtrar as buscas.
+docs = split_by_sections(documents, chunk_size=1000)
 
 # 3. Criar Embeddings
-# Usamos OpenAIEmbeddings para converter o texto em vetores numéricos.
+# Usamos OpenAIEmbeddings (via provider_gateway.py, com conexões compartilhadas e limite de taxa) para converter o texto em vetores numéricos.
 # Você pode usar outros modelos de embeddings, como Sentence Transformers da Hugging Face.
-embeddings = OpenAIEmbeddings(openai_api_key=OPENAI_API_KEY)
-
-# 4. Armazenar os embeddings no ChromaDB
-# Criamos um diretório persistente para o ChromaDB, para que os dados sejam salvos.
-persist_directory = "./chroma_db"
-vectordb = Chroma.from_documents(documents=docs, embedding=embeddings, persist_directory=persist_directory)
-vectordb.persist() # Garante que os dados sejam escritos no disco
-
-print(f"Base de conhecimento salva em {persist_directory} com {len(docs)} documentos indexados.")
+embeddings = get_embeddings()
+
+# 4. Armazenar os embeddings
+# Por padrão usamos o ChromaDB. Com VECTOR_STORE_BACKEND=local_ann, usamos o índice local aproximado
+# (IVF + vetores int8 memory-mapped, veja local_vector_store.py), mais leve para bases grandes.
+backend = os.getenv("VECTOR_STORE_BACKEND", "chroma")
+persist_directory = tenant_persist_directory(tenant, backend)
+if backend == "local_ann":
+    from local_vector_store import LocalANNStore
+    vectordb = LocalANNStore.from_documents(documents=docs, embedding=embeddings, persist_directory=persist_directory)
+else:
+    # Criamos um diretório persistente para o ChromaDB, para que os dados sejam salvos.
+    vectordb = Chroma.from_documents(documents=docs, embedding=embeddings, persist_directory=persist_directory)
+    vectordb.persist() # Garante que os dados sejam escritos no disco
+
+print(f"Base de conhecimento do tenant '{tenant}' salva em {persist_directory} com {len(docs)} documentos indexados.")
+print(f"Seções encontradas: {', '.join(sorted({doc.metadata['section'] for doc in docs if doc.metadata['section']}))}")
 print("Execute este script sempre que houver mudanças nos documentos da base de conhecimento.")
@@ -0,0 +1,135 @@
+# tool_cache.py
+# Cache (memoização) dos resultados de ferramentas "puras": mesma entrada -> mesma saída.
+# Durante uma execução, o agente costuma chamar a mesma ferramenta com os mesmos argumentos várias vezes;
+# com o cache, a partir da segunda chamada a resposta é instantânea (e sem custo, no caso de ferramentas com LLM).
+#
+# Uso:
+#   @memoize_tool(ttl=600, maxsize=256)
+#   def analyze_sentiment(text: str) -> str: ...
+#
+#   @side_effecting   # Ferramentas com efeitos colaterais (e-mail, calendário...) NUNCA são cacheadas.
+#   def send_email_function(...): ...
+
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+# Estatísticas de todas as ferramentas cacheadas, por nome da função (veja tool_cache_stats()).
+_registry = {}
+
+
+def normalize_argument(value):
+    """
+    Normalização padrão dos argumentos: espaços extras não mudam a chave do cache.
+    Ex: "  Olá   mundo " e "Olá mundo" geram a mesma chave.
+    """
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+def casefold_argument(value):
+    """Normalização que também ignora maiúsculas/minúsculas (ex: "Python" e "python")."""
+    value = normalize_argument(value)
+    return value.lower() if isinstance(value, str) else value
+
+def ignore_argument(value):
+    """Para argumentos que não influenciam o resultado (ex: callbacks): ficam fora da chave do cache."""
+    return None
+
+def is_cacheable_result(result) -> bool:
+    # Nossas ferramentas sinalizam falhas retornando textos começando com "Erro" - esses não são guardados.
+    return not (isinstance(result, str) and result.startswith("Erro"))
+
+def side_effecting(func):
+    """
+    Marca uma ferramenta como tendo efeitos colaterais (enviar e-mail, criar evento, postar mensagem...).
+    Essas ferramentas precisam ser executadas toda vez, então combiná-las com @memoize_tool gera um erro,
+    em qualquer ordem dos decorators.
+    """
+    if getattr(func, "memoized", False):
+        raise ValueError(f"A ferramenta '{func.__name__}' é cacheada e não pode ser marcada como @side_effecting.")
+    func.side_effecting = True
+    return func
+
+def memoize_tool(ttl: float = 300, maxsize: int = 128, normalize=normalize_argument, cache_if=is_cacheable_result,
+                 version=None):
+    """
+    Decorator que guarda os resultados de uma ferramenta pura.
+    Args:
+        ttl (float): Tempo de vida de cada resultado, em segundos.
+        maxsize (int): Máximo de resultados guardados; ao passar do limite, o menos usado é descartado (LRU).
+        normalize: Função aplicada a cada argumento antes de montar a chave do cache, ou um dicionário
+                   {nome_do_argumento: função} para normalizar cada argumento de um jeito
+                   (os argumentos fora do dicionário usam normalize_argument).
+        cache_if: Função que decide se um resultado pode ser guardado (por padrão, erros não são).
+        version: Função opcional que recebe os argumentos (dicionário nome -> valor) e retorna a versão dos
+                 dados usados pela ferramenta (ex: a data de modificação da base de conhecimento). A versão
+                 entra na chave, então resultados calculados com dados antigos deixam de ser usados.
+    """
+    def decorator(func):
+        if getattr(func, "side_effecting", False):
+            raise ValueError(f"A ferramenta '{func.__name__}' tem efeitos colaterais e não pode ser cacheada.")
+
+        signature = inspect.signature(func)
+        entries = OrderedDict() # chave -> (momento de expiração, resultado)
+        lock = threading.Lock()
+        stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+        def make_key(args, kwargs):
+            # Chamadas posicionais e nomeadas (e valores padrão) geram a mesma chave.
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if isinstance(normalize, dict):
+                key = tuple((name, normalize.get(name, normalize_argument)(value)) for name, value in bound.arguments.items())
+            else:
+                key = tuple((name, normalize(value)) for name, value in bound.arguments.items())
+            return key if version is None else key + (("__version__", version(dict(bound.arguments))),)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            now = time.monotonic()
+            with lock:
+                if key in entries:
+                    expires_at, result = entries[key]
+                    if expires_at > now:
+                        entries.move_to_end(key)
+                        stats["hits"] += 1
+                        return result
+                    del entries[key]
+                    stats["expirations"] += 1
+                stats["misses"] += 1
+
+            # A ferramenta roda fora do lock, para não bloquear chamadas com outros argumentos.
+            result = func(*args, **kwargs)
+            if cache_if(result):
+                with lock:
+                    entries[key] = (time.monotonic() + ttl, result)
+                    entries.move_to_end(key)
+                    while len(entries) > maxsize:
+                        entries.popitem(last=False)
+                        stats["evictions"] += 1
+            return result
+
+        def cache_info() -> dict:
+            with lock:
+                total = stats["hits"] + stats["misses"]
+                return dict(stats, size=len(entries), maxsize=maxsize, ttl=ttl,
+                            hit_rate=stats["hits"] / total if total else 0.0)
+
+        def cache_clear():
+            with lock:
+                entries.clear()
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        wrapper.memoized = True
+        _registry[func.__name__] = wrapper
+        return wrapper
+    return decorator
+
+def tool_cache_stats() -> dict:
+    """Retorna as estatísticas (hits, misses, hit_rate, ...) de todas as ferramentas cacheadas."""
+    return {name: wrapper.cache_info() for name, wrapper in _registry.items()}
@@ -0,0 +1,351 @@
+# tools_module.py
+import smtplib
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+import datetime
+import random
+from collections import namedtuple
+from langchain_community.vectorstores import Chroma
+from provider_gateway import get_chat_model, get_embeddings
+import os
+from knowledge_base import rerank_documents, compress_context, detect_section # Reranking, compressão e filtro por seção
+from knowledge_base import DEFAULT_TENANT, TenantStoreCache, tenant_persist_directory, directory_size, index_version # Bases por tenant
+from knowledge_base import SpeculativePrefetcher # Busca antecipada enquanto o agente ainda "pensa"
+from tool_cache import memoize_tool, side_effecting, casefold_argument, ignore_argument # Cache de resultados das ferramentas puras
+from agent_budget import BudgetExceeded, remaining_budget_s # Orçamento da execução do agente
+
+# Exemplo SIMPLIFICADO de função para enviar e-mail.
+# Em produção, usaria a API real do Gmail, Outlook, etc., com OAuth2.0
+@side_effecting
+def send_email_function(recipient_email: str, subject: str, body: str) -> str:
+    """
+    Simula o envio de um e-mail para um destinatário.
+    Em um ambiente real, esta função se conectaria a um servidor SMTP ou usaria uma API de e-mail (ex: Gmail API).
+    Retorna uma mensagem de sucesso ou erro.
+    """
+    print(f"--- Simulação de Envio de E-mail ---")
+    print(f"Para: {recipient_email}")
+    print(f"Assunto: {subject}")
+    print(f"Corpo: {body}")
+    print(f"------------------------------------")
+
+    # Apenas para demonstração: simulamos sucesso.
+    # Em um cenário real, você teria a lógica de conexão SMTP aqui.
+    if "@" not in recipient_email:
+        return f"Erro: Endereço de e-mail inválido: {recipient_email}"
+    return f"E-mail com assunto '{subject}' enviado com sucesso para {recipient_email}."
+
+# Exemplo SIMPLIFICADO de funções para interagir com um calendário.
+# Em produção, usaria a Google Calendar API, Outlook Calendar API, etc.
+@side_effecting
+def create_calendar_event_function(title: str, start_time: str, end_time: str, attendees: str, description: str = "") -> str:
+    """
+    Simula a criação de um evento de calendário.
+    Args:
+        title (str): Título do evento.
+        start_time (str): Data e hora de início do evento (ex: '2024-12-25 09:00').
+        end_time (str): Data e hora de fim do evento (ex: '2024-12-25 10:00').
+        attendees (str): Lista de e-mails dos participantes, separados por vírgula.
+        description (str): Descrição do evento.
+    Returns:
+        str: Mensagem de confirmação ou erro.
+    """
+    print(f"--- Simulação de Criação de Evento de Calendário ---")
+    print(f"Título: {title}")
+    print(f"Início: {start_time}")
+    print(f"Fim: {end_time}")
+    print(f"Participantes: {attendees}")
+    print(f"Descrição: {description}")
+    print(f"--------------------------------------------------")
+
+    # Simula validação de data
+    try:
+        start_dt = datetime.datetime.strptime(start_time, '%Y-%m-%d %H:%M')
+        end_dt = datetime.datetime.strptime(end_time, '%Y-%m-%d %H:%M')
+        if start_dt >= end_dt:
+            return "Erro: A data/hora de início deve ser anterior à data/hora de término."
+    except ValueError:
+        return "Erro: Formato de data/hora inválido. Use 'AAAA-MM-DD HH:MM'."
+
+    return f"Evento '{title}' agendado com sucesso de {start_time} a {end_time} com {attendees}."
+
+@side_effecting
+def check_calendar_availability_function(start_time: str, end_time: str, attendees: str) -> str:
+    """
+    Simula a verificação de disponibilidade de participantes em um período.
+    Em um ambiente real, esta função consultaria a API do calendário.
+    Retorna uma string indicando a disponibilidade.
+    """
+    print(f"--- Simulação de Verificação de Disponibilidade ---")
+    print(f"Início: {start_time}")
+    print(f"Fim: {end_time}")
+    print(f"Participantes: {attendees}")
+    print(f"--------------------------------------------------")
+
+    try:
+        start_dt = datetime.datetime.strptime(start_time, '%Y-%m-%d %H:%M')
+        end_dt = datetime.datetime.strptime(end_time, '%Y-%m-%d %H:%M')
+        if start_dt >= end_dt:
+            return "Erro: A data/hora de início deve ser anterior à data/hora de término."
+    except ValueError:
+        return "Erro: Formato de data/hora inválido. Use 'AAAA-MM-DD HH:MM'."
+    
+    # Simula disponibilidade aleatória para alguns participantes
+    attendee_list = [a.strip() for a in attendees.split(',') if a.strip()]
+    unavailable = []
+    for attendee in attendee_list:
+        if random.random() < 0.2: # 20% de chance de estar indisponível
+            unavailable.append(attendee)
+            
+    if unavailable:
+        return f"Os seguintes participantes estão indisponíveis entre {start_time} e {end_time}: {', '.join(unavailable)}. Sugira outro horário."
+    else:
+        return f"Todos os participantes ({attendees}) estão disponíveis entre {start_time} e {end_time}."
+
+@side_effecting
+def post_slack_message_function(channel: str, message: str) -> str:
+    """
+    Simula o envio de uma mensagem para um canal do Slack.
+    Em um ambiente real, esta função usaria a API do Slack.
+    """
+    print(f"--- Simulação de Post no Slack ---")
+    print(f"Canal: #{channel}")
+    print(f"Mensagem: {message}")
+    print(f"---------------------------------")
+    if not channel.strip():
+        return "Erro: O canal do Slack não pode ser vazio."
+    return f"Mensagem postada com sucesso no canal #{channel}."
+
+
+# Certifique-se que o OPENAI_API_KEY está disponível como variável de ambiente
+# (o provider_gateway.py a lê ao criar os clientes compartilhados de embeddings e LLM)
+
+# Parâmetros da etapa pós-recuperação (reranking + compressão)
+RAG_CANDIDATES_K = 8          # Quantos trechos buscar no ChromaDB antes do reranking
+RAG_RERANK_TOP_N = 3          # Quantos trechos manter após o reranking
+RAG_CONTEXT_MAX_TOKENS = 300  # Orçamento aproximado de tokens para o contexto enviado ao LLM
+RAG_PREFETCH_K = 24           # Candidatos da busca antecipada (sem filtro de seção; o filtro é aplicado depois)
+
+RAG_PROMPT = """Use apenas o contexto abaixo para responder à pergunta.
+Se a resposta não estiver no contexto, diga que não sabe.
+
+Contexto:
+{context}
+
+Pergunta: {question}
+Resposta:"""
+
+# Backend da base vetorial: "chroma" (padrão, em ./chroma_db) ou "local_ann"
+# (índice aproximado IVF com vetores int8 memory-mapped, em ./ann_index - veja local_vector_store.py).
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma")
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "8")) # Clusters examinados por busca: mais recall x mais latência
+
+def open_vector_store(embeddings_model, tenant: str = DEFAULT_TENANT):
+    """
+    Abre a base de conhecimento de um tenant, persistida pelo setup_chromadb.py, com o backend configurado.
+    """
+    persist_directory = tenant_persist_directory(tenant, VECTOR_STORE_BACKEND)
+    if not os.path.isdir(persist_directory):
+        raise FileNotFoundError(f"Base de conhecimento do tenant '{tenant}' não encontrada em {persist_directory}. Execute o setup_chromadb.py.")
+    if VECTOR_STORE_BACKEND == "local_ann":
+        from local_vector_store import LocalANNStore # Importado só quando usado (depende do numpy)
+        return LocalANNStore(persist_directory=persist_directory, embedding_function=embeddings_model, nprobe=ANN_NPROBE)
+    return Chroma(persist_directory=persist_directory, embedding_function=embeddings_model)
+
+def list_sections(vectordb) -> list:
+    """
+    Lista os títulos de seção (metadado 'section') gravados pelo setup_chromadb.py.
+    Bases indexadas antes da divisão por seções não têm esse metadado e retornam uma lista vazia.
+    Lê os metadados da coleção inteira: chame só ao abrir a base (veja open_knowledge_base).
+    """
+    metadatas = vectordb.get(include=["metadatas"])["metadatas"]
+    return sorted({m.get("section") for m in metadatas if m and m.get("section")})
+
+def knowledge_base_version(tenant: str = DEFAULT_TENANT):
+    """Versão da base do tenant em disco: muda quando o setup_chromadb.py reindexa a base."""
+    try:
+        return index_version(tenant_persist_directory(tenant, VECTOR_STORE_BACKEND))
+    except ValueError:
+        return None # Tenant inválido: o erro é informado pela própria consulta
+
+# Uma base aberta: a base vetorial e a lista das suas seções, calculada uma única vez na abertura.
+OpenKnowledgeBase = namedtuple("OpenKnowledgeBase", ["store", "sections"])
+
+def open_knowledge_base(tenant: str = DEFAULT_TENANT) -> OpenKnowledgeBase:
+    vectordb = open_vector_store(get_embeddings(), tenant)
+    return OpenKnowledgeBase(store=vectordb, sections=list_sections(vectordb))
+
+def estimate_memory(tenant: str, kb: OpenKnowledgeBase) -> int:
+    """
+    Memória estimada de uma base aberta. O índice local informa a sua (os vetores memory-mapped não contam);
+    para o Chroma, que carrega o índice HNSW na RAM, usamos o tamanho da pasta em disco.
+    """
+    if hasattr(kb.store, "memory_bytes"):
+        return kb.store.memory_bytes()
+    return directory_size(tenant_persist_directory(tenant, VECTOR_STORE_BACKEND))
+
+def close_knowledge_base(kb: OpenKnowledgeBase):
+    """Libera a memória de uma base removida do cache de tenants."""
+    try:
+        if hasattr(kb.store, "close"):
+            kb.store.close()
+            return
+        # Chroma: para o "system" do cliente (índice HNSW em memória, conexão com o SQLite).
+        client = getattr(kb.store, "_client", None)
+        system = getattr(client, "_system", None)
+        if system is not None:
+            system.stop()
+            # O chromadb reaproveita um system por pasta; removemos o parado, para que reabrir a base crie um novo.
+            for registry in ("_identifier_to_system", "_identifer_to_system"):
+                getattr(type(client), registry, {}).pop(getattr(client, "_identifier", None), None)
+    except Exception as e:
+        print(f"Erro ao fechar a base de conhecimento: {e}")
+
+# Bases abertas neste processo: cada tenant é aberto na primeira consulta e mantido em um cache LRU,
+# limitado pelo número de bases (KB_MAX_OPEN_TENANTS) e pela memória estimada (KB_MAX_OPEN_MB).
+# As bases removidas do cache são fechadas, liberando a memória de fato.
+_tenant_stores = TenantStoreCache(
+    opener=open_knowledge_base,
+    max_open=int(os.getenv("KB_MAX_OPEN_TENANTS", "8")),
+    max_bytes=int(os.getenv("KB_MAX_OPEN_MB", "512")) * 1024 * 1024,
+    size_fn=estimate_memory,
+    closer=close_knowledge_base,
+    version_fn=knowledge_base_version,
+)
+
+def retrieve_candidates(query: str, tenant: str = DEFAULT_TENANT) -> list:
+    """
+    Recupera mais candidatos do que o necessário, procurando só na seção da pergunta quando ela é clara.
+    """
+    # Carrega a base de dados vetorial do tenant (aberta só na primeira consulta e reaproveitada depois).
+    # Dentro do 'with', a base não é fechada, mesmo que saia do cache de tenants durante a busca.
+    with _tenant_stores.use(tenant) as kb:
+        candidates = []
+        section = detect_section(query, kb.sections)
+        if section:
+            candidates = kb.store.similarity_search(query, k=RAG_CANDIDATES_K, filter={"section": section})
+        if not candidates:
+            candidates = kb.store.similarity_search(query, k=RAG_CANDIDATES_K)
+        return candidates
+
+# Busca antecipada: o agente chama prefetch_knowledge_base(pergunta) assim que a pergunta chega, e a busca
+# (embedding + busca vetorial) corre em paralelo com o primeiro "Thought" do LLM. Se o agente decidir consultar
+# a base, query_knowledge_base_function aproveita os candidatos já recuperados; se não, eles são descartados.
+# A busca antecipada não filtra por seção: a pergunta do usuário pode tocar várias seções ("trabalho remoto e
+# férias") e o agente costuma consultar uma de cada vez. O filtro da consulta do agente é aplicado na hora do uso.
+def prefetch_candidates(question: str, tenant: str = DEFAULT_TENANT) -> list:
+    with _tenant_stores.use(tenant) as kb:
+        return kb.store.similarity_search(question, k=RAG_PREFETCH_K)
+
+def refine_prefetched(query: str, tenant: str, candidates: list):
+    """
+    Aplica aos candidatos antecipados o filtro de seção da consulta do agente.
+    Retorna None (consulta normal) se não sobrarem candidatos suficientes para o reranking.
+    """
+    # Com menos de RAG_PREFETCH_K resultados, a busca antecipada trouxe a base inteira: nada ficou de fora do filtro.
+    complete = len(candidates) < RAG_PREFETCH_K
+    section = detect_section(query, _tenant_stores.get(tenant).sections)
+    if section:
+        candidates = [doc for doc in candidates if doc.metadata.get("section") == section]
+    enough = len(candidates) >= RAG_RERANK_TOP_N or (complete and candidates)
+    return candidates[:RAG_CANDIDATES_K] if enough else None
+
+_prefetcher = SpeculativePrefetcher(
+    fetch_fn=prefetch_candidates,
+    max_workers=int(os.getenv("KB_PREFETCH_WORKERS", "4")),
+    ttl_s=float(os.getenv("KB_PREFETCH_TTL_S", "60")),
+)
+
+def prefetch_knowledge_base(question: str, tenant: str = DEFAULT_TENANT):
+    """Inicia, em segundo plano, a recuperação de candidatos para a pergunta do usuário."""
+    _prefetcher.start(question, tenant)
+
+def discard_prefetch(question: str, tenant: str = DEFAULT_TENANT):
+    """Descarta a busca antecipada da pergunta, caso o agente não tenha consultado a base."""
+    _prefetcher.discard(question, tenant)
+
+def prefetch_stats() -> dict:
+    """Buscas antecipadas iniciadas, aproveitadas (hits), consultas sem busca aproveitável (misses) e descartadas."""
+    return _prefetcher.prefetch_stats()
+
+# As respostas da base (LLM com temperature=0) podem ser reaproveitadas por alguns minutos,
+# enquanto a base não for reindexada (a versão da base entra na chave do cache).
+@memoize_tool(ttl=600, maxsize=512, normalize={"query": casefold_argument, "callbacks": ignore_argument},
+              version=lambda arguments: knowledge_base_version(arguments["tenant"]))
+def query_knowledge_base_function(query: str, tenant: str = DEFAULT_TENANT, callbacks=None) -> str:
+    """
+    Consulta a base de conhecimento ChromaDB para obter informações relevantes.
+    Os trechos recuperados são reordenados e comprimidos (apenas as frases relevantes)
+    antes de irem para o LLM, reduzindo o tamanho do prompt, a latência e o custo.
+    Parâmetros: query (str) - A pergunta a ser feita à base de conhecimento.
+                tenant (str) - A unidade de negócio dona da base (padrão: "default").
+                callbacks - Os callbacks da execução do agente (passados pela Tool): a chamada ao LLM é
+                            contabilizada no orçamento e seu timeout é limitado ao prazo restante.
+    """
+    # LLM para a etapa de Geração (compartilhado pelo gateway: não é recriado a cada consulta)
+    llm_rag = get_chat_model("gpt-3.5-turbo", temperature=0.0)
+
+    # Executa a query
+    try:
+        # 1. Usa os candidatos da busca antecipada (se a pergunta do usuário for parecida com a consulta do agente)
+        #    ou recupera agora. Certifique-se que OPENAI_API_KEY está configurada no ambiente.
+        candidates = _prefetcher.take(query, tenant, refine=lambda prefetched: refine_prefetched(query, tenant, prefetched))
+        if candidates is None:
+            candidates = retrieve_candidates(query, tenant)
+        # 2. ... reordena pela sobreposição de termos com a pergunta ...
+        best_docs = rerank_documents(query, candidates, top_n=RAG_RERANK_TOP_N)
+        # 3. ... e envia ao LLM apenas as frases relevantes, dentro do orçamento de tokens.
+        context = compress_context(query, best_docs, max_tokens=RAG_CONTEXT_MAX_TOKENS)
+        remaining_s = remaining_budget_s(callbacks)
+        timeout = {} if remaining_s is None else {"timeout": remaining_s}
+        response = llm_rag.invoke(RAG_PROMPT.format(context=context, question=query), config={"callbacks": callbacks}, **timeout)
+        return response.content
+    except BudgetExceeded:
+        raise # O orçamento do agente acabou: a execução inteira é interrompida
+    except Exception as e:
+        return f"Erro ao consultar a base de conhecimento: {e}"
+
+
+
+from textblob import TextBlob # pip install textblob
+@memoize_tool(ttl=3600, maxsize=1024)
+def analyze_sentiment(text: str) -> str:
+    analysis = TextBlob(text)
+    if analysis.sentiment.polarity > 0:
+        return "Positivo"
+    elif analysis.sentiment.polarity < 0:
+        return "Negativo"
+    else:
+        return "Neutro"
+# Adicionar ao agente:
+# Tool(name="Sentiment Analyzer", func=analyze_sentiment, description="Útil para analisar o sentimento de um texto (Positivo, Negativo, Neutro).")
+
+
+# Simulação: em um cenário real, usaria um LLM ou um serviço de geração de código
+# "Python" e "python" geram o mesmo snippet, então a linguagem é normalizada na chave do cache.
+@memoize_tool(ttl=3600, maxsize=256, normalize={"language": casefold_argument})
+def generate_code_snippet(description: str, language: str) -> str:
+    if language.lower() == "python":
+        return f"# Python code for: {description}\ndef example_function():\n    pass"
+    elif language.lower() == "javascript":
+        return f"// Javascript code for: {description}\nfunction exampleFunction() {{}}"
+    return "Linguagem não suportada para geração de snippet."
+# Adicionar ao agente:
+# Tool(name="Code Generator", func=generate_code_snippet, description="Gera um snippet de código em uma linguagem específica (python, javascript) dado uma descrição.")
+
+
+
+import sqlite3 # Exemplo com SQLite
+@side_effecting
+def query_database(sql_query: str) -> str:
+    try:
+        conn = sqlite3.connect('my_data.db') # Conexão com DB
+        cursor = conn.cursor()
+        cursor.execute(sql_query)
+        results = cursor.fetchall()
+        conn.close()
+        return str(results) # Retorna resultados como string
+    except Exception as e:
+        return f"Erro ao executar SQL: {e}"
+# Adicionar ao agente:
+# Tool(name="Database Query", func=query_database, description="Executa uma consulta SQL segura em um banco de dados interno. Útil para extrair dados brutos.")